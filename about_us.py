@@ -0,0 +1,116 @@
+import hashlib
+import json
+import os
+from datetime import datetime
+from urllib.parse import urlparse
+
+import requests
+from termcolor import colored
+
+CACHE_DIR = './data/cache/'
+
+
+def section_titles(year):
+    """Titles of the sections of the About Us page and their category."""
+    return {
+        f"Board {year}-{year+1}": "board",
+        "Membri attivi": "esners",
+        "Alumni": "alumni"
+    }
+
+
+def parse_roster(content, year):
+    """Return the names of the About Us page as a dict of category -> names.
+
+    The headings are read in document order in a single walk: an h2 with a known
+    title starts its section, and every h3/h4 inside a styled div after it is a member.
+    """
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(content, 'html.parser')
+    titles = section_titles(year)
+    roster = {category: [] for category in titles.values()}
+
+    category = None
+    for tag in soup.find_all(['h2', 'h3', 'h4']):
+        if tag.name == 'h2':
+            title = tag.get_text(strip=True)
+            if title in titles:
+                category = titles[title]
+        elif category is not None and tag.contents and tag.find_parent('div', style=True):
+            name = str(tag.contents[0]).strip()
+            if name:
+                roster[category].append(name)
+    return roster
+
+
+def cache_path_for(url, cache_dir=CACHE_DIR):
+    """Cache file of a site's About Us page, one per host so many sections can share the cache directory."""
+    host = urlparse(url).netloc.replace(':', '_') or 'local'
+    return os.path.join(cache_dir, f'about_us_{host}.json')
+
+
+def load_cache(cache_path):
+    try:
+        with open(cache_path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_cache(cache_path, cache):
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    tmp_path = cache_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(cache, f, indent=4, ensure_ascii=False)
+    os.replace(tmp_path, cache_path)
+
+
+def fetch_roster(url, year, session=None, timeout=10, cache_path=None):
+    """Return the roster of the About Us page, revalidating the cached copy with ETag/Last-Modified.
+
+    An unchanged page (304, or 200 with the same content) isn't parsed again. If the
+    site can't be reached the cached roster is used, if there is one for the same year.
+    """
+    session = session or requests
+    cache_path = cache_path or cache_path_for(url)
+    cache = load_cache(cache_path)
+    if cache is not None and (cache.get("url") != url or cache.get("year") != year):
+        cache = None
+
+    headers = {}
+    if cache is not None:
+        if cache.get("etag"):
+            headers["If-None-Match"] = cache["etag"]
+        if cache.get("last_modified"):
+            headers["If-Modified-Since"] = cache["last_modified"]
+
+    try:
+        response = session.get(url, headers=headers, timeout=timeout)
+        if response.status_code != 304:
+            response.raise_for_status()
+    except requests.RequestException as e:
+        if cache is None:
+            raise
+        print(colored(f"Could not fetch {url} ({e}), using the roster cached on {cache['fetched_at']}.", "red"))
+        return cache["roster"]
+
+    if response.status_code == 304:
+        return cache["roster"]
+
+    sha256 = hashlib.sha256(response.content).hexdigest()
+    if cache is not None and cache.get("sha256") == sha256:
+        roster = cache["roster"]
+    else:
+        roster = parse_roster(response.content, year)
+
+    save_cache(cache_path, {
+        "url": url,
+        "year": year,
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "sha256": sha256,
+        "fetched_at": datetime.now().isoformat(timespec='seconds'),
+        "roster": roster,
+    })
+    return roster
@@ -0,0 +1,183 @@
+import asyncio
+import time
+from urllib.parse import urlparse
+
+import aiohttp
+
+from crawler import WebCrawler, logger
+from rate_limit import is_permanent_error
+
+
+class HostLimiter:
+    """Per-host concurrency budget for the async crawler, paced by the shared adaptive rate limiter."""
+
+    def __init__(self, concurrency, rate_limiter, metrics):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.rate_limiter = rate_limiter
+        self.metrics = metrics
+
+    async def __aenter__(self):
+        await self.semaphore.acquire()
+        # Space out the start of the requests without blocking the other workers
+        self.metrics.observe("throttle", await self.rate_limiter.wait_async())
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.semaphore.release()
+
+
+class AsyncWebCrawler(WebCrawler):
+    """WebCrawler running on asyncio with a pooled, keep-alive HTTP session."""
+
+    def __init__(self, *args, per_host_limit=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # By default don't send more requests to a host than the threaded crawler would
+        self.per_host_limit = per_host_limit or self.max_workers
+        self.host_limiters = {}
+        self.async_queue = None
+
+    def host_limiter(self, url):
+        """Return the limiter of the host serving the URL."""
+        host = urlparse(url).netloc
+        if host not in self.host_limiters:
+            self.host_limiters[host] = HostLimiter(self.per_host_limit, self.rate_limiter, self.metrics)
+        return self.host_limiters[host]
+
+    def enqueue(self, url):
+        """Add a URL to the queue of pages to visit."""
+        self.async_queue.put_nowait(url)
+
+    def trace_config(self):
+        """Return an aiohttp TraceConfig feeding the DNS and connect timings to the metrics."""
+        trace_config = aiohttp.TraceConfig()
+
+        def stage_timer(stage):
+            async def on_stage_start(session, context, params):
+                context.step = time.perf_counter()
+
+            async def on_stage_end(session, context, params):
+                self.metrics.observe(stage, time.perf_counter() - context.step)
+
+            return on_stage_start, on_stage_end
+
+        dns_start, dns_end = stage_timer("dns")
+        connect_start, connect_end = stage_timer("connect")
+        trace_config.on_dns_resolvehost_start.append(dns_start)
+        trace_config.on_dns_resolvehost_end.append(dns_end)
+        trace_config.on_connection_create_start.append(connect_start)
+        trace_config.on_connection_create_end.append(connect_end)
+        return trace_config
+
+    async def fetch(self, session, url, headers):
+        """Download a page, respecting the budget of its host. Return status, content and headers."""
+        async with self.host_limiter(url):
+            self.metrics.inc("requests")
+            start = time.perf_counter()
+            async with session.get(url, headers=headers) as response:
+                # The response is returned as soon as the headers are read
+                self.handle_status(response.status, response.headers, time.perf_counter() - start)
+                response.raise_for_status()  # Raise exception for 4XX/5XX responses
+                start = time.perf_counter()
+                content = await response.read()
+                self.metrics.observe("download", time.perf_counter() - start)
+                self.metrics.inc("bytes", len(content))
+                return response.status, content, response.headers
+
+    async def process_url_async(self, session, url):
+        """Process a single URL: fetch content, analyze, and extract new links."""
+        if not self.claim_url(url):
+            return
+
+        logger.info(f"Processing: {url}")
+
+        # Try to fetch the page with retries
+        success = False
+        error_message = ""
+        status_code = None
+        cached = self.cached_page(url)
+
+        for attempt in range(self.max_retries):
+            if attempt:
+                self.metrics.inc("retries")
+            try:
+                status, content, headers = await self.fetch(session, url, self.conditional_headers(cached))
+
+                # Save the findings and add the new links to the queue. The page is parsed (or the
+                # process pool waited for) in a thread, so the event loop keeps fetching meanwhile
+                page = await asyncio.get_running_loop().run_in_executor(
+                    None, self.page_from_response, url, status, content, headers, cached
+                )
+                self.record_page(url, page)
+
+                # Mark as successful and save to checked.txt
+                success = True
+                self.save_checked_url(url)
+                self.metrics.inc("pages")
+                break  # Exit retry loop on success
+
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error_message = str(e) or type(e).__name__
+                self.metrics.inc("errors")
+                if isinstance(e, (asyncio.TimeoutError, aiohttp.ClientConnectionError)):
+                    self.rate_limiter.on_throttle()
+                logger.error(f"Error fetching {url} (attempt {attempt+1}/{self.max_retries}): {error_message}")
+                status_code = e.status if isinstance(e, aiohttp.ClientResponseError) else None
+                if is_permanent_error(status_code):
+                    logger.error(f"Not retrying {url}: permanent error {status_code}")
+                    break
+                if attempt == self.max_retries - 1:
+                    logger.error(f"Failed to process {url} after {self.max_retries} attempts")
+
+        # If all retries failed, save to error.txt
+        if not success:
+            self.save_error_url(url, error_message, status_code)
+            self.metrics.inc("failed")
+
+    async def worker_async(self, session):
+        """Worker coroutine that processes URLs from the queue."""
+        while True:
+            url = await self.async_queue.get()
+            self.metrics.request_started()
+            try:
+                await self.process_url_async(session, url)
+            except Exception as e:
+                logger.error(f"Unexpected error in worker: {str(e)}")
+                # Save unexpected errors to error file too
+                self.save_error_url(url, f"Unexpected error: {str(e)}")
+            finally:
+                self.metrics.request_finished()
+                self.async_queue.task_done()
+
+    async def crawl_async(self):
+        """Crawl the site with a fixed set of worker coroutines sharing one session."""
+        self.async_queue = asyncio.Queue()
+
+        for url in self.initial_urls():
+            self.async_queue.put_nowait(url)
+        self.start_metrics(self.async_queue.qsize)
+
+        connector = aiohttp.TCPConnector(limit=self.max_workers, limit_per_host=self.per_host_limit)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout,
+                                         trace_configs=[self.trace_config()]) as session:
+            workers = [asyncio.create_task(self.worker_async(session)) for _ in range(self.max_workers)]
+            await self.async_queue.join()
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    def crawl(self):
+        """Start the crawling process on an asyncio event loop."""
+        start_time = time.time()
+        logger.info(f"Starting async crawl from {self.start_url} with {self.max_workers} concurrent requests "
+                    f"({self.per_host_limit} per host)")
+        logger.info(f"Using checked.txt for previously visited URLs: {self.use_txt}")
+
+        try:
+            asyncio.run(self.crawl_async())
+        finally:
+            # Flush the stores and the output files even if the crawl was interrupted
+            self.stop_metrics()
+            self.close()
+        self.report(start_time)
+        return self.results
@@ -0,0 +1,305 @@
+"""Time the stages of the tools on synthetic data and compare them with a baseline.
+
+Run from the root of the repository:
+    python -m benchmarks.run --sizes 1000,10000,100000 --save-baseline
+    python -m benchmarks.run --sizes 1000,10000,100000
+"""
+import argparse
+import contextlib
+import functools
+import gc
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from termcolor import colored
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks import synthetic
+
+BASELINE_PATH = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+YEAR = 2024
+
+
+def measure(run):
+    """Run a stage, returning (its result, seconds, peak traced memory in MB)."""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = run()
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, seconds, peak / 2**20
+
+
+@contextlib.contextmanager
+def working_directory(path):
+    """The tools write to paths relative to the current directory, run them in the benchmark one."""
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+@contextlib.contextmanager
+def serve(directory):
+    """Serve a directory on a local port, yielding its base URL."""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), functools.partial(QuietHandler, directory=directory))
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}/"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def members_xlsx_path(workdir, size):
+    """Return the path of the synthetic workbook of a size, writing it the first time (it's slow for big sizes)."""
+    path = os.path.join(workdir, f'members_{size}.xlsx')
+    if not os.path.exists(path):
+        synthetic.write_members_xlsx(path, synthetic.make_members(size))
+    return path
+
+
+def bench_xlsx(workdir, size, args):
+    from members_xlsx import parse_members_xlsx
+
+    path = members_xlsx_path(workdir, size)
+    members, seconds, peak = measure(lambda: parse_members_xlsx(path))
+    return len(members), seconds, peak
+
+
+def bench_about_us(workdir, size, args):
+    from about_us import parse_roster
+
+    html = synthetic.about_us_html(synthetic.make_members(size), YEAR).encode()
+    roster, seconds, peak = measure(lambda: parse_roster(html, YEAR))
+    return sum(len(names) for names in roster.values()), seconds, peak
+
+
+def bench_reconcile(workdir, size, args):
+    from about_us import parse_roster
+    from members import MemberSet
+    from members_xlsx import parse_members_xlsx
+    from name_matching import reconcile
+    from names import name_key, replace_multiple_spaces_with_single_space
+
+    members = synthetic.make_members(size)
+    dataframe = parse_members_xlsx(members_xlsx_path(workdir, size))
+    roster = parse_roster(synthetic.about_us_html(members, YEAR).encode(), YEAR)
+    # Start from cold normalization caches, like a new run
+    name_key.cache_clear()
+    replace_multiple_spaces_with_single_space.cache_clear()
+
+    def run():
+        members_from_xlsx = MemberSet.from_dataframe(dataframe)
+        members_from_website = MemberSet.from_categories({category: roster[category] for category in ("alumni", "esners", "board")})
+        members_from_website.merge_category("board", "esners")
+        return reconcile(members_from_xlsx, members_from_website)
+
+    _, seconds, peak = measure(run)
+    return size, seconds, peak
+
+
+def bench_birthdays(workdir, size, args):
+    """Build the birthday index and ask for the next week's birthdays of every day of a year."""
+    from datetime import date, timedelta
+
+    from birthday_index import BirthdayIndex
+    from members import Member
+
+    members = [Member(f"{first} {last}", category, birthdate) for first, last, birthdate, category in synthetic.make_members(size)]
+
+    def run():
+        index = BirthdayIndex(members)
+        start = date(2024, 1, 1)
+        return sum(len(index.upcoming(7, start + timedelta(days=day))) for day in range(366))
+
+    _, seconds, peak = measure(run)
+    return size, seconds, peak
+
+
+def bench_crawl(workdir, size, args):
+    site = os.path.join(workdir, f'site_{args.pages}')
+    if not os.path.exists(site):
+        synthetic.write_site(site, args.pages)
+    crawl_dir = os.path.join(workdir, 'crawl')
+    shutil.rmtree(crawl_dir, ignore_errors=True)
+    os.makedirs(crawl_dir)
+
+    with working_directory(crawl_dir), serve(site) as url:
+        from crawler import WebCrawler
+
+        logging.getLogger("crawler").setLevel(logging.WARNING)
+        crawler = WebCrawler(url, max_workers=args.workers, timeout=5, max_retries=1, delay=0.001,
+                             parser=args.parser, metrics_interval=0)
+        _, seconds, peak = measure(crawler.crawl)
+    return len(crawler.visited), seconds, peak
+
+
+def bench_photos(workdir, size, args):
+    photos = os.path.join(workdir, 'photos_source')
+    if not os.path.exists(photos):
+        synthetic.write_photos(photos, args.photos)
+    run_dir = os.path.join(workdir, 'photos_run')
+    shutil.rmtree(run_dir, ignore_errors=True)
+    shutil.copytree(photos, os.path.join(run_dir, 'photos'))
+
+    with working_directory(run_dir):
+        import members_from_photos
+
+        def run():
+            manifest = members_from_photos.PhotoManifest('./photos', members_from_photos.html_fingerprint())
+            members_from_photos.update_photos('./photos', manifest)
+            members_from_photos.generate_html_from_photos('./photos', manifest=manifest)
+            manifest.save()
+
+        _, seconds, peak = measure(run)
+    return args.photos, seconds, peak
+
+
+# Modules that the command line must not import before running a command
+HEAVY_MODULES = {"requests", "bs4", "pandas", "numpy", "PIL", "aiohttp", "cv2", "dateutil", "ics"}
+STARTUP_COMMANDS = [[], ["diff"], ["birthdays"], ["photos"], ["crawl"]]
+
+
+def imported_modules(command):
+    """Return the top level modules imported by a command, from python -X importtime."""
+    process = subprocess.run([sys.executable, '-X', 'importtime', *command], cwd=ROOT, capture_output=True, text=True)
+    modules = set()
+    for line in process.stderr.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            modules.add(line.rsplit('|', 1)[1].strip().split('.')[0])
+    return modules
+
+
+def bench_startup(workdir, size, args):
+    """Time `esn.py --help` and the help of every command, the best of 5 runs each."""
+    heavy = HEAVY_MODULES & imported_modules(['esn.py', '--help'])
+    if heavy:
+        print(colored(f"esn.py imports {', '.join(sorted(heavy))} at startup", "red"))
+
+    total = 0.0
+    for command in STARTUP_COMMANDS:
+        times = []
+        for _ in range(5):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, 'esn.py', *command, '--help'], cwd=ROOT, stdout=subprocess.DEVNULL, check=True)
+            times.append(time.perf_counter() - start)
+        total += min(times)
+    # The memory of the child processes isn't traced
+    return len(STARTUP_COMMANDS), total, 0.0
+
+
+# Stages measured for every size of the roster, and the ones that don't depend on it
+SIZED_STAGES = {
+    "xlsx": bench_xlsx,
+    "about_us": bench_about_us,
+    "reconcile": bench_reconcile,
+    "birthdays": bench_birthdays,
+}
+FIXED_STAGES = {
+    "startup": bench_startup,
+    "crawl": bench_crawl,
+    "photos": bench_photos,
+}
+
+
+def compare(results, baseline, tolerance):
+    """Print the results next to the baseline. Return the names of the regressed benchmarks."""
+    regressions = []
+    print(f"{'benchmark':<24}{'seconds':>10}{'items/s':>12}{'peak MB':>10}{'vs baseline':>24}")
+    for name, result in results.items():
+        line = f"{name:<24}{result['seconds']:>10.3f}{result['items_per_second']:>12.0f}{result['peak_mb']:>10.1f}"
+        base = baseline.get(name)
+        if base is None:
+            print(line + f"{'(no baseline)':>24}")
+            continue
+        time_ratio = result['seconds'] / base['seconds'] if base['seconds'] else 1.0
+        memory_ratio = result['peak_mb'] / base['peak_mb'] if base['peak_mb'] else 1.0
+        comparison = f"{time_ratio:>8.2f}x time {memory_ratio:>5.2f}x mem"
+        if time_ratio > 1 + tolerance or memory_ratio > 1 + tolerance:
+            regressions.append(name)
+            print(line + colored(comparison, "red"))
+        else:
+            print(line + colored(comparison, "green"))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the tools on synthetic rosters, sites and photos.")
+    parser.add_argument('--sizes', default='1000,10000', help='comma separated numbers of members (default 1000,10000)')
+    parser.add_argument('--stages', default=','.join([*SIZED_STAGES, *FIXED_STAGES]), help='comma separated stages to run')
+    parser.add_argument('--pages', type=int, default=2000, help='pages of the local site crawled')
+    parser.add_argument('--workers', type=int, default=10, help='crawler threads')
+    parser.add_argument('--parser', default='fast', help='crawler HTML parser, "fast" or "bs4"')
+    parser.add_argument('--photos', type=int, default=50, help='photos processed')
+    parser.add_argument('--workdir', help='directory of the synthetic data, reused between runs (default: a temporary one)')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='JSON file of the baseline results')
+    parser.add_argument('--save-baseline', action='store_true', help='save the results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='slowdown or memory growth reported as a regression')
+    args = parser.parse_args()
+
+    stages = args.stages.split(',')
+    sizes = [int(size) for size in args.sizes.split(',')]
+    workdir = args.workdir or tempfile.mkdtemp(prefix='esn_bench_')
+    os.makedirs(workdir, exist_ok=True)
+
+    results = {}
+    for stage in stages:
+        if stage in SIZED_STAGES:
+            runs = [(f"{stage}[{size}]", SIZED_STAGES[stage], size) for size in sizes]
+        elif stage in FIXED_STAGES:
+            runs = [(stage, FIXED_STAGES[stage], None)]
+        else:
+            parser.error(f"unknown stage {stage}")
+        for name, bench, size in runs:
+            items, seconds, peak = bench(workdir, size, args)
+            results[name] = {
+                "items": items,
+                "seconds": seconds,
+                "items_per_second": items / seconds if seconds else 0.0,
+                "peak_mb": peak,
+            }
+
+    if not args.workdir:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump({**baseline, **results}, f, indent=4)
+        print(f"Baseline saved in {args.baseline}")
+    elif regressions:
+        print(colored(f"Regressions: {', '.join(regressions)}", "red"))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
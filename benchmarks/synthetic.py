@@ -0,0 +1,132 @@
+"""Synthetic data for the benchmarks: Jupiter-style workbooks, About Us pages, sites and photos."""
+import os
+import random
+from datetime import date, timedelta
+
+FIRST_NAMES = [
+    "Marco", "Giulia", "Luca", "Francesca", "Alessandro", "Chiara", "Matteo", "Sara", "Lorenzo", "Martina",
+    "Davide", "Elena", "Niccolò", "Anna", "Simone", "Federica", "Andrea", "Giorgia", "Tommaso", "Alice",
+    "José", "Zoë", "François", "Ana María", "Jürgen", "Łukasz", "Ömer", "Inês", "Søren", "Eleni",
+]
+SYLLABLES = [
+    "ro", "ssi", "bi", "an", "chi", "fer", "ra", "co", "lom", "bo", "mar", "ti", "ni", "gal", "lo",
+    "ric", "ci", "de", "lu", "ca", "be", "ne", "det", "to", "san", "tor", "val", "len", "ger", "mo",
+]
+
+SECTION_TITLES = ["Board {year}-{next_year}", "Membri attivi", "Alumni"]
+
+
+def make_surname(rng):
+    surname = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize()
+    if rng.random() < 0.1:
+        surname = "D'" + surname
+    return surname
+
+
+def make_members(n, seed=0):
+    """Return n members as (first name, last name, birthdate, category), about 30% of them alumni."""
+    rng = random.Random(seed)
+    members = []
+    seen = set()
+    while len(members) < n:
+        first = rng.choice(FIRST_NAMES)
+        last = make_surname(rng)
+        if rng.random() < 0.05:
+            last += " " + make_surname(rng)
+        if (first, last) in seen:
+            continue
+        seen.add((first, last))
+        birthdate = date(1990, 1, 1) + timedelta(days=rng.randrange(365 * 15))
+        category = "alumni" if rng.random() < 0.3 else "esners"
+        members.append((first, last, birthdate, category))
+    return members
+
+
+def write_members_xlsx(path, members):
+    """Write the members as a Jupiter export: ESNER and ALUMNO sheets, with more columns than the ones read."""
+    import pandas as pd
+
+    sheets = {"esners": "ESNER", "alumni": "ALUMNO"}
+    with pd.ExcelWriter(path) as writer:
+        for category, sheet_name in sheets.items():
+            rows = [member for member in members if member[3] == category]
+            pd.DataFrame({
+                "ESNcard": [f"ESN{i:07d}" for i in range(len(rows))],
+                "First Name": [first for first, _, _, _ in rows],
+                "Last Name": [last for _, last, _, _ in rows],
+                "Email": [f"member{i}@example.com" for i in range(len(rows))],
+                "Birthdate": [birthdate.strftime("%d/%m/%Y") for _, _, birthdate, _ in rows],
+                "Nationality": ["IT"] * len(rows),
+            }).to_excel(writer, sheet_name=sheet_name, index=False)
+
+
+def about_us_html(members, year, seed=0, missing=0.02, extra=0.01):
+    """Return an About Us page listing the members, with a few of them missing and a few extra ones.
+
+    The first 10 esners are the board. Some names are in upper case or in another word order,
+    like the ones typed by hand on the website.
+    """
+    rng = random.Random(seed)
+    sections = {"board": [], "esners": [], "alumni": []}
+    for first, last, _, category in members:
+        if rng.random() < missing:
+            continue
+        name = f"{first} {last}"
+        if rng.random() < 0.05:
+            name = f"{last} {first}"
+        elif rng.random() < 0.05:
+            name = name.upper()
+        if category == "esners" and len(sections["board"]) < 10:
+            sections["board"].append(name)
+        else:
+            sections[category].append(name)
+    for _ in range(int(len(members) * extra)):
+        sections["esners"].append(f"{rng.choice(FIRST_NAMES)} {make_surname(rng)}")
+
+    titles = [title.format(year=year, next_year=year + 1) for title in SECTION_TITLES]
+    parts = ["<html><body><div class=\"content\">"]
+    for title, names in zip(titles, sections.values()):
+        parts.append(f"<h2>{title}</h2>")
+        for name in names:
+            tag = "h4" if len(name) >= 19 else "h3"
+            parts.append(
+                f'<div style="display: inline-block; width: 160px;"><img src="/files/members/x.jpg"/>'
+                f'<div style="margin-top: 2px"><{tag} style="margin: 0">{name}'
+                f'<span style="display: block">Membro attivo</span></{tag}></div></div>'
+            )
+    parts.append("</div></body></html>")
+    return "\n".join(parts)
+
+
+def write_site(directory, pages, links_per_page=10, seed=0):
+    """Write a static site of interlinked pages under directory, reachable from index.html."""
+    rng = random.Random(seed)
+    os.makedirs(os.path.join(directory, "page"), exist_ok=True)
+
+    def page_html(title, links):
+        anchors = "".join(f'<li><a href="{link}">{link}</a></li>' for link in links)
+        words = " ".join(rng.choice(SYLLABLES) for _ in range(200))
+        return f"<html><head><title>{title}</title></head><body><h1>{title}</h1><p>{words}</p><ul>{anchors}</ul></body></html>"
+
+    with open(os.path.join(directory, "index.html"), "w") as f:
+        f.write(page_html("Home", [f"/page/{i}.html" for i in range(min(pages, links_per_page))]))
+    for i in range(pages):
+        # Every page links to the next one, so they are all reachable
+        links = {f"/page/{(i + 1) % pages}.html"}
+        links.update(f"/page/{rng.randrange(pages)}.html" for _ in range(links_per_page - 1))
+        with open(os.path.join(directory, "page", f"{i}.html"), "w") as f:
+            f.write(page_html(f"Page {i}", sorted(links)))
+
+
+def write_photos(directory, n, seed=0, size=(1200, 1500)):
+    """Write n member photos named NAME_SURNAME, as a mix of jpg, jpeg and png files."""
+    from PIL import Image
+
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    extensions = [".jpg", ".jpg", ".jpeg", ".png"]
+    for i, (first, last, _, _) in enumerate(make_members(n, seed)):
+        color = (rng.randrange(256), rng.randrange(256), rng.randrange(256))
+        image = Image.new("RGB", size, color)
+        name = f"{first}_{last}".replace(" ", "_").replace("'", "")
+        image.save(os.path.join(directory, name + extensions[i % len(extensions)]))
@@ -0,0 +1,76 @@
+import calendar
+from datetime import date, timedelta
+
+import numpy as np
+
+# First day of every month counted in a leap year, so 29 February has its own day (60) in every year
+MONTH_STARTS = np.array([0, 31, 60, 91, 121, 152, 182, 213, 244, 274, 305, 335])
+FEBRUARY_29 = 60
+DAYS = 366
+
+
+def day_of_year(month, day):
+    """Day of a date in a leap year (1-366), for scalars or numpy arrays."""
+    return MONTH_STARTS[np.asarray(month) - 1] + np.asarray(day)
+
+
+def birthday_in_year(birthdate, year):
+    """Return the date of the birthday in a year. Who was born on 29 February celebrates on the 28th in the other years."""
+    if birthdate.month == 2 and birthdate.day == 29 and not calendar.isleap(year):
+        return date(year, 2, 28)
+    return date(year, birthdate.month, birthdate.day)
+
+
+class BirthdayIndex:
+    """Members with a birthdate, sorted once by the day of their birthday.
+
+    The days are kept in a numpy array, so the birthdays of any period are found with
+    two binary searches. Members of many sections can be indexed together.
+    """
+
+    def __init__(self, members):
+        members = [member for member in members if member.birthdate is not None]
+        days = day_of_year(
+            np.fromiter((member.birthdate.month for member in members), dtype=np.int16, count=len(members)),
+            np.fromiter((member.birthdate.day for member in members), dtype=np.int16, count=len(members)),
+        )
+        order = np.argsort(days, kind='stable')
+        self.days = days[order]
+        self.members = [members[i] for i in order]
+
+    def __len__(self):
+        return len(self.members)
+
+    def between_days(self, first, last):
+        """Return the members whose birthday is between two days of the year (1-366), both included."""
+        start = np.searchsorted(self.days, first, side='left')
+        end = np.searchsorted(self.days, last, side='right')
+        return self.members[start:end]
+
+    def in_period(self, first, last):
+        """Return (birthday, member) for the birthdays from the date first to the date last included, in order."""
+        if (last - first).days >= DAYS - 1:
+            years = range(first.year, last.year + 1)
+            return [(day, member) for year in years for day, member in self.occurrences(year) if first <= day <= last]
+        if first.year != last.year:
+            return self.in_period(first, date(first.year, 12, 31)) + self.in_period(date(last.year, 1, 1), last)
+
+        first_day = int(day_of_year(first.month, first.day))
+        last_day = int(day_of_year(last.month, last.day))
+        # In the other years 29 February is celebrated on the 28th
+        if not calendar.isleap(first.year) and last_day == FEBRUARY_29 - 1:
+            last_day = FEBRUARY_29
+        return [(birthday_in_year(member.birthdate, first.year), member) for member in self.between_days(first_day, last_day)]
+
+    def upcoming(self, days, today=None):
+        """Return (birthday, member) for the birthdays in the next days (today included)."""
+        today = today or date.today()
+        return self.in_period(today, today + timedelta(days=days - 1))
+
+    def in_month(self, year, month):
+        """Return (birthday, member) for the birthdays of a month."""
+        return self.in_period(date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1]))
+
+    def occurrences(self, year):
+        """Return (birthday, member) for every birthday of the year, in order."""
+        return [(birthday_in_year(member.birthdate, year), member) for member in self.members]
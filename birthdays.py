@@ -1,80 +1,39 @@
-from checks_for_differences import replace_multiple_spaces_with_single_space, colored
-import os
-import pandas as pd
-from datetime import datetime, timedelta
-from ics import Calendar, Event
+import argparse
+from members_xlsx import load_members_xlsx
+from members import MemberSet
+from birthday_index import BirthdayIndex, birthday_in_year
+from datetime import datetime
 
 def fetch_members_from_xlsx():
-    # Find the most recent file in the members directory
-    members_dir = './members/'
-    files = [f for f in os.listdir(members_dir) if f.startswith('ESN ENEA Modena_complete') and f.endswith('.xlsx')]
-    files.sort(key=lambda x: os.path.getmtime(os.path.join(members_dir, x)), reverse=True)
-    path = os.path.join(members_dir, files[0])
-
-    # Calculate the file's age
-    file_mod_time = datetime.fromtimestamp(os.path.getmtime(path))
-    file_age = datetime.now() - file_mod_time
-
-    # Print the file's age in green if less than 15 days old, otherwise in red
-    if file_age < timedelta(days=15):
-        print(colored(f"The file is {file_age.days} days old.", "green"))
-    else:
-        print(colored(f"The file is {file_age.days} days old.", "red"))
-    # Read the Excel file
-    xls = pd.ExcelFile(path)
-    
-    # Read the ESNER and ALUMNI sheets
-    esner_df = pd.read_excel(xls, sheet_name='ESNER')
-    alumni_df = pd.read_excel(xls, sheet_name='ALUMNO')
-    
-    members = {
-        "esners": [],
-        "alumni": []
-    }
-    
-    # Extract names from ESNER table
-    for index, row in esner_df.iterrows():
-        full_name = f"{row['First Name']} {row['Last Name']}"
-        full_name = replace_multiple_spaces_with_single_space(full_name)
-        birthday = datetime.strptime(row['Birthdate'], '%d/%m/%Y') if isinstance(row['Birthdate'], str) else row['Birthdate']
-        members["esners"].append({full_name: birthday})
-    
-    # Extract names from ALUMNI table
-    for index, row in alumni_df.iterrows():
-        full_name = f"{row['First Name']} {row['Last Name']}"
-        full_name = replace_multiple_spaces_with_single_space(full_name)
-        birthday = datetime.strptime(row['Birthdate'], '%d/%m/%Y') if isinstance(row['Birthdate'], str) else row['Birthdate']
-        members["alumni"].append({full_name: birthday})
-    
-    return members
+    return MemberSet.from_dataframe(load_members_xlsx())
 
 def generate_message(sorted_members):
     # Generate message of NAME SURNAME : BIRTHDAY
     # Name and surname are of fixed lenght based on the longest name
-    max_length = max(len(name) for member in members["esners"] + members["alumni"] for name in member.keys())
+    max_length = max((len(member.name) for member in sorted_members), default=0)
     message = ""
 
 
     for member in sorted_members:
-        for name, birthday in member.items():
-            message += f"{name.ljust(max_length)} : {birthday.strftime('%d/%m')}\n"
+        message += f"{member.name.ljust(max_length)} : {member.birthdate.strftime('%d/%m')}\n"
     # Print the message
     print(message.strip())
 
 def filter_members(members):
-    # Filter members containing "esn"
-    members["esners"] = [member for member in members["esners"] if "esn" not in list(member.keys())[0].lower()]
-    members["alumni"] = [member for member in members["alumni"] if "esn" not in list(member.keys())[0].lower()]
-    sorted_members = sorted(
-        members["esners"] + members["alumni"], 
-        key=lambda member: list(member.values())[0].strftime('%m%d')
-    )
+    # Members without a valid birthdate can't be in the calendar
+    # ("ESN" accounts and duplicates are already dropped by MemberSet)
+    return BirthdayIndex(members).members
 
-    return sorted_members
+def print_upcoming(birthdays, today):
+    # Generate message of DD/MM NAME SURNAME (in N days)
+    for birthday, member in birthdays:
+        days = (birthday - today).days
+        if days < 0:
+            when = f"{-days} days ago"
+        else:
+            when = "today" if days == 0 else "tomorrow" if days == 1 else f"in {days} days"
+        print(f"{birthday.strftime('%d/%m')} {member.name} ({when})")
 
-from datetime import datetime
-
-from datetime import datetime
 
 def generate_google_calendar_link(sorted_members, year):
     base_url = "https://calendar.google.com/calendar/render?action=TEMPLATE"
@@ -85,17 +44,17 @@ def generate_google_calendar_link(sorted_members, year):
     description_lines = ["🎉 Birthdays of ESN ENEA Modena members:\n"]
 
     for member in sorted_members:
-        for name, birthday in member.items():
-            rdate = f"{year}{birthday.strftime('%m')}{birthday.strftime('%d')}T000000Z"
-            rdates.append(rdate)
-            description_lines.append(f"• {name}: {birthday.strftime('%B %d')}")
+        birthday = birthday_in_year(member.birthdate, year)
+        rdate = f"{birthday.strftime('%Y%m%d')}T000000Z"
+        rdates.append(rdate)
+        description_lines.append(f"• {member.name}: {birthday.strftime('%B %d')}")
 
     rrule_dates = ",".join(rdates)
     description = "\n".join(description_lines)
     encoded_description = description.replace(' ', '%20').replace('\n', '%0A')
 
     # Use the first birthday as the anchor date
-    first_date = rdates[0] if rdates else f"{current_year}0101T000000Z"
+    first_date = rdates[0] if rdates else f"{year}0101T000000Z"
     end_date = first_date[:8] + "T235900Z"
 
     url = (
@@ -111,27 +70,45 @@ def generate_google_calendar_link(sorted_members, year):
 
 
 def generate_birthday_ics(sorted_members, year, filename="birthdays.ics"):
+    from ics import Calendar, Event
+
     calendar = Calendar()
 
     for member in sorted_members:
-        for name, birthday in member.items():
-            event = Event()
-            event.name = f"Compleanno {name}"
-            event.begin = f"{year}-{birthday.strftime('%m')}-{birthday.strftime('%d')}"
-            event.make_all_day()
-            event.location = "Modena, Italy"
-            event.description = f"Compleanno di {name} - ESN ENEA Modena 🎉"
-            calendar.events.add(event)
+        birthday = birthday_in_year(member.birthdate, year)
+        event = Event()
+        event.name = f"Compleanno {member.name}"
+        event.begin = birthday.isoformat()
+        event.make_all_day()
+        event.location = "Modena, Italy"
+        event.description = f"Compleanno di {member.name} - ESN ENEA Modena 🎉"
+        calendar.events.add(event)
 
     with open(filename, 'w', encoding='utf-8') as f:
         f.writelines(calendar)
 
 
-if __name__ == "__main__":
-    year = datetime.now().year
-    members = fetch_members_from_xlsx()
-    sorted_members = filter_members(members)
+def main(days=None, month=False):
+    """Print the birthdays and generate the calendars, or only the birthdays of the next days or of this month."""
+    today = datetime.now().date()
+    year = today.year
+    index = BirthdayIndex(fetch_members_from_xlsx())
+    if days:
+        print_upcoming(index.upcoming(days, today), today)
+        return
+    if month:
+        print_upcoming(index.in_month(year, today.month), today)
+        return
+    sorted_members = index.members
     generate_message(sorted_members)
     print(len(sorted_members))
     print(generate_google_calendar_link(sorted_members, year))
-    generate_birthday_ics(sorted_members, year)
\ No newline at end of file
+    generate_birthday_ics(sorted_members, year)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="List the birthdays of the members and generate the calendars.")
+    parser.add_argument('--days', type=int, help='only list the birthdays of the next DAYS days')
+    parser.add_argument('--month', action='store_true', help='only list the birthdays of this month')
+    args = parser.parse_args()
+    main(args.days, args.month)
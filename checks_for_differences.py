@@ -1,17 +1,23 @@
 # Parameters
 from parameters import parameters
 import requests
-from bs4 import BeautifulSoup
-import pandas as pd
+import argparse
 import json
 import os
-from datetime import datetime, timedelta
-from termcolor import colored
+import time
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
 from dateutil.easter import easter
-import requests
-import pandas
+from name_matching import reconcile
+from members_xlsx import load_members_xlsx
+from members import MemberSet
+from about_us import fetch_roster
+from requests.adapters import HTTPAdapter
+from run_history import RunHistory
+
+JOKE_CACHE_PATH = './data/cache/joke.json'
 
-def get_italian_joke(subtype=None):
+def get_italian_joke(subtype=None, timeout=3):
     """
     Recupera una battuta dall'API Italian Jokes.
     
@@ -21,7 +27,8 @@ def get_italian_joke(subtype=None):
          Ad esempio: subtype="One-liner"
          
     Restituisce:
-      Il testo della battuta, oppure un messaggio d'errore in caso di problemi.
+      Il testo della battuta, oppure l'ultima battuta salvata (o un messaggio d'errore)
+      se l'API non risponde entro timeout secondi.
     """
     base_url = "https://italian-jokes.vercel.app/api/jokes"
     params = {}
@@ -29,7 +36,7 @@ def get_italian_joke(subtype=None):
         params["subtype"] = subtype
 
     try:
-        response = requests.get(base_url, params=params)
+        response = requests.get(base_url, params=params, timeout=timeout)
         response.raise_for_status()
         # La risposta JSON ha il seguente formato:
         # {
@@ -40,9 +47,24 @@ def get_italian_joke(subtype=None):
         # }
         data = response.json()
         joke = data.get("joke", "Nessuna battuta trovata.")
+        if "joke" in data:
+            save_joke(joke)
         return joke
-    except requests.RequestException as e:
-        return f"Errore durante il recupero della battuta: {e}"
+    except (requests.RequestException, ValueError) as e:
+        return cached_joke(f"Errore durante il recupero della battuta: {e}")
+
+def save_joke(joke):
+    os.makedirs(os.path.dirname(JOKE_CACHE_PATH), exist_ok=True)
+    with open(JOKE_CACHE_PATH, 'w', encoding='utf-8') as f:
+        json.dump({"joke": joke}, f, ensure_ascii=False)
+
+def cached_joke(default):
+    """Return the last joke fetched, or default if there is none."""
+    try:
+        with open(JOKE_CACHE_PATH, encoding='utf-8') as f:
+            return json.load(f)["joke"]
+    except (OSError, ValueError, KeyError):
+        return default
 
     
 def prGreen(skk): print("\033[92m {}\033[00m" .format(skk))
@@ -59,156 +81,22 @@ def convert_sets_to_lists(data):
     else:
         return data
     
-def replace_multiple_spaces_with_single_space(string):
-    """Replace multiple spaces with a single space and capitalize the first letter of each word."""
-    string = string.strip().encode('utf-8').decode('utf-8')
-    return ' '.join([word.capitalize() for word in string.split()])
-
-def fix_names(d):
-    """Fix the names in the dictionary."""
-    for category in d:
-        d[category] = [replace_multiple_spaces_with_single_space(name) for name in d[category] if "ESN" not in name.upper()]
-    return d
-
-def equal_names(name1, name2):
-    """Check if two names are different. Consider 2 names equal if they share 2 names out of 3."""
-    name1 = name1.split()
-    name2 = name2.split()
-    if len(name1) != 2 or len(name2) != 2:
-        shared_names = 0
-        for name in name1:
-            if name in name2:
-                shared_names += 1
-        return shared_names >= 2
-    else:
-        return name1 == name2
-
-def fetch_members_from_website():
-    url = parameters["website"] + 'about-us'
-    response = requests.get(url)
-    soup = BeautifulSoup(response.content, 'html.parser')
-
-    members = {
-        "board": [],
-        "esners": [],
-        "alumni": []
-    }
-
-    sections = {
-        f"Board {parameters['year']}-{parameters['year']+1}": "board",
-        "Membri attivi": "esners",
-        "Alumni": "alumni"
-    }
-
-    for section_title, key in sections.items():
-        section = soup.find('h2', string=section_title)
-        if section:
-            divs = section.find_next_siblings('div', style=True)
-            for div in divs:
-                name_tag = div.find('h3')
-                if name_tag:
-                    name = name_tag.contents[0].strip()
-                    members[key].append(name)
-                name_tag = div.find('h4')
-                if name_tag:
-                    name = name_tag.contents[0].strip()
-                    members[key].append(name)
-
-    added_members = set()
-    unique_members_dict = {
-        "board": [],
-        "esners": [],
-        "alumni": []
-    }
-    # Iterate through categories in order of priority
-    for category in ["alumni", "esners", "board"]:
-        for member in members[category]:
-            if member not in added_members:
-                unique_members_dict[category].append(member)
-                added_members.add(member)
-
-    return fix_names(unique_members_dict)
-
-def fetch_members_from_xlsx():
-    # Find the most recent file in the members directory
-    members_dir = './members/'
-    files = [f for f in os.listdir(members_dir) if f.startswith('ESN ENEA Modena_complete') and f.endswith('.xlsx')]
-    files.sort(key=lambda x: os.path.getmtime(os.path.join(members_dir, x)), reverse=True)
-    path = os.path.join(members_dir, files[0])
-
-    # Calculate the file's age
-    file_mod_time = datetime.fromtimestamp(os.path.getmtime(path))
-    file_age = datetime.now() - file_mod_time
-
-    # Print the file's age in green if less than 15 days old, otherwise in red
-    if file_age < timedelta(days=15):
-        print(colored(f"The file is {file_age.days} days old.", "green"))
-    else:
-        print(colored(f"The file is {file_age.days} days old.", "red"))
-    # Read the Excel file
-    xls = pd.ExcelFile(path)
-    
-    # Read the ESNER and ALUMNI sheets
-    esner_df = pd.read_excel(xls, sheet_name='ESNER')
-    alumni_df = pd.read_excel(xls, sheet_name='ALUMNO')
-    
-    members = {
-        "esners": [],
-        "alumni": []
-    }
-    
-    # Extract names from ESNER table
-    for index, row in esner_df.iterrows():
-        full_name = f"{row['First Name']} {row['Last Name']}"
-        members["esners"].append(full_name)
-    
-    # Extract names from ALUMNI table
-    for index, row in alumni_df.iterrows():
-        full_name = f"{row['First Name']} {row['Last Name']}"
-        members["alumni"].append(full_name)
-    
-    return fix_names(members)
+def fetch_members_from_website(session=None, website=None, year=None):
+    url = (website or parameters["website"]) + 'about-us'
+    members = fetch_roster(url, year or parameters['year'], session=session, timeout=parameters.get("timeout", 10))
 
-def find_differences(members_from_website, members_from_xlsx):
-    differences = {
-        "esners": set(),
-        "alumni": set(),
-    }
+    # Categories in order of priority: a member listed in more sections is kept in the first one
+    return MemberSet.from_categories({
+        "alumni": members["alumni"],
+        "esners": members["esners"],
+        "board": members["board"]
+    })
 
-    # Puts missing members, that are in the website but not in the xlsx, in the differences set
-    # Members from the xlsx are considered the source of truth
-    
-    for category in ["esners", "alumni"]:
-        for member in members_from_xlsx[category]:
-            found = False
-            for website_member in members_from_website[category]:
-                if equal_names(member, website_member):
-                    found = True
-                    break
-            if not found:
-                differences[category].add(member)
-    return differences
-
-def find_differences_website_not_in_xlsx(members_from_website, members_from_xlsx):
-    differences = {
-        "esners": set(),
-        "alumni": set(),
-    }
-    # Puts missing members, that are in the xlsx but not in the website, in the differences set
-    # Members from the website are considered the source of truth
-    for category in ["esners", "alumni"]:
-        for member in members_from_website[category]:
-            found = False
-            for xlsx_member in members_from_xlsx[category]:
-                if equal_names(member, xlsx_member):
-                    found = True
-                    break
-            if not found:
-                differences[category].add(member)
-    return differences
+def fetch_members_from_xlsx(path=None):
+    return MemberSet.from_dataframe(load_members_xlsx(path))
 
 # Generate message for WhatsApp
-def generate_message(differences, board):
+def generate_message(differences, board, history, joke=None):
     festivity = nearest_festivity()
     message = f"Siete stati visitati dal 🧙‍♂️ webmaster🧙‍♂️\n"
     # Add welcome message in italian based on the daytime
@@ -223,7 +111,9 @@ def generate_message(differences, board):
         message += "Buona notte🌚! \n"
     if festivity:
         message += f"Buon{festivity}!\n"
-    message += f"Battuta dal sapore italico: {get_italian_joke('One-liner')}\n"
+    if joke is None:
+        joke = get_italian_joke('One-liner')
+    message += f"Battuta dal sapore italico: {joke}\n"
     message += "Ai nuovi membri, se desiderate essere sul sito di ESN More nella page About https://modena.esn.it/?q=about-us\n"
     message += "Fornitemi una foto📸(possibilmente 640px640p, croppabile tipo con https://ucsc.github.io/web-tools/images/)\n"
     message += "Il webmaster tende a croppare☐ e stretchare i malcapitati che forniscono una foto non conforme 😈\n"
@@ -235,35 +125,15 @@ def generate_message(differences, board):
             else:
                 message += f"➡️ {member}\n"
     differences = differences["esners"].union(differences["alumni"])
-    # Check if missing members from log file are present
-    missing_members = get_last_log()
-    if missing_members != "No log found.":
-        good_members = [member for member in missing_members if member not in differences]
-        if good_members:
-            message += f"Sii un buon esner che manda le foto come {', '.join(good_members)}"
+    # Record the run, the members missing last time and not anymore sent their photos
+    good_members = history.record(differences)["resolved"]
+    if good_members:
+        message += f"Sii un buon esner che manda le foto come {', '.join(good_members)}"
     message += "\nWebmaster🧙‍♂️\n"
     message += "email: webmaster@esnmore.it\n"
     message += "_messaggio assolutamente non autogenerato_\n"
-    # Append missing members to log
-    if differences:
-        add_missing_members_to_log_file(differences)
     return message
 
-def add_missing_members_to_log_file(differences):
-    with open('./data/log_missing.txt', 'a') as f:
-        f.write(f"{datetime.now()}: {differences}\n")
-
-def get_last_log():
-    with open('./data/log_missing.txt', 'r') as f:
-        lines = f.readlines()
-        if lines:
-            last_log = lines[-1]
-            # Convert the string representation of the set back to a list
-            last_log_set = eval(last_log.split(": ", 1)[1])
-            return list(last_log_set)
-        else:
-            return "No log found."
-
 def nearest_festivity():
     today = datetime.today().date()
     festivities = {
@@ -312,19 +182,26 @@ def calculate_min_distance(today_date, festivities):
     return nearest_festivity, distances[nearest_festivity]
 
 
-if __name__ == '__main__':
+def check_section():
     """Compare the members from Jupiter(through excel) with the members from the website.
     .xlsx IS THE SOURCE OF TRUTH.
     Save the differences in a json file."""
-    members_from_website = fetch_members_from_website()
-    members_from_xlsx = fetch_members_from_xlsx()
+    # The slow steps run together: the run takes as long as the slowest one
+    joke_deadline = parameters.get("joke_deadline", 3)
+    joke_deadline_at = time.monotonic() + joke_deadline
+    executor = ThreadPoolExecutor(max_workers=3)
+    website_future = executor.submit(fetch_members_from_website)
+    xlsx_future = executor.submit(fetch_members_from_xlsx)
+    joke_future = executor.submit(get_italian_joke, 'One-liner', joke_deadline)
+    members_from_website = website_future.result()
+    members_from_xlsx = xlsx_future.result()
 
     # Add board members to esners
-    members_from_website["esners"].extend(members_from_website["board"])
-    board = members_from_website["board"]
-    del members_from_website["board"]
+    board = members_from_website.names("board")
+    members_from_website.merge_category("board", "esners")
 
-    differences = find_differences(members_from_website, members_from_xlsx)
+    # Both directions at once: (in xlsx but not in website, in website but not in xlsx)
+    differences, differences_website_not_in_xlsx = reconcile(members_from_xlsx, members_from_website)
     for category in differences:
         print(f"{category}:")
         for member in differences[category]:
@@ -334,7 +211,6 @@ if __name__ == '__main__':
                 prGreen(f"{member}")
         print()
 
-    differences_website_not_in_xlsx = find_differences_website_not_in_xlsx(members_from_website, members_from_xlsx)
     for category in differences_website_not_in_xlsx:
         print(f"{category}:")
         for member in differences_website_not_in_xlsx[category]:
@@ -348,12 +224,85 @@ if __name__ == '__main__':
     with open('./data/differences.json', 'w') as f:
         json.dump(convert_sets_to_lists(differences), f, indent=4)
     with open('./data/members_from_website.json', 'w') as f:
-        json.dump(convert_sets_to_lists(members_from_website), f, indent=4)
+        json.dump(members_from_website.to_dict(), f, indent=4)
     with open('./data/members_from_xlsx.json', 'w') as f:
-        json.dump(convert_sets_to_lists(members_from_xlsx), f, indent=4)
+        json.dump(members_from_xlsx.to_dict(), f, indent=4)
 
+    history = RunHistory()
     print("WhatsApp message:")
-    print(generate_message(differences, board))
+    try:
+        joke = joke_future.result(timeout=max(0, joke_deadline_at - time.monotonic()))
+    except FuturesTimeoutError:
+        joke = cached_joke("Nessuna battuta trovata.")
+    executor.shutdown(wait=False)
+    print(generate_message(differences, board, history, joke))
+
+    # Members who keep not sending their photo
+    missing_runs = parameters.get("missing_runs", 3)
+    for member, runs in history.missing_for_more_than(missing_runs).items():
+        prRed(f"{member} has been missing for {runs} runs")
+
+
+def reconcile_section(section, session):
+    """Reconcile one section of the batch, returning its entry of the combined report."""
+    members_from_website = fetch_members_from_website(session, section["website"], section.get("year"))
+    members_from_xlsx = fetch_members_from_xlsx(section["xlsx"])
+    board = members_from_website.names("board")
+    members_from_website.merge_category("board", "esners")
+    differences, differences_website_not_in_xlsx = reconcile(members_from_xlsx, members_from_website)
+    return {
+        "name": section.get("name", section["website"]),
+        "website": section["website"],
+        "xlsx": section["xlsx"],
+        "board": board,
+        "missing_from_website": {category: sorted(names) for category, names in differences.items()},
+        "missing_from_xlsx": {category: sorted(names) for category, names in differences_website_not_in_xlsx.items()},
+    }
 
-    
+def check_sections(sections, max_workers=8):
+    """Reconcile many sections at once and save a combined report in data/batch_report.json.
 
+    sections is a list of dicts with "website" and "xlsx" (path of the Jupiter export),
+    and optionally "name" and "year". The sections share one connection pool, and the
+    name normalization cache is shared by all the threads.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=len(sections) or 1, pool_maxsize=max_workers)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+
+    report = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(reconcile_section, section, session) for section in sections]
+        for section, future in zip(sections, futures):
+            try:
+                report.append(future.result())
+            except Exception as e:
+                # A broken section doesn't stop the others
+                report.append({"name": section.get("name", section["website"]), "error": str(e)})
+    session.close()
+
+    for entry in report:
+        if "error" in entry:
+            prRed(f"{entry['name']}: {entry['error']}")
+            continue
+        missing = sum(len(names) for names in entry["missing_from_website"].values())
+        extra = sum(len(names) for names in entry["missing_from_xlsx"].values())
+        print_color = prGreen if missing == 0 and extra == 0 else prRed
+        print_color(f"{entry['name']}: {missing} missing from the website, {extra} not in the xlsx")
+
+    os.makedirs('./data', exist_ok=True)
+    with open('./data/batch_report.json', 'w') as f:
+        json.dump(report, f, indent=4, ensure_ascii=False)
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare the members on Jupiter with the members on the website.")
+    parser.add_argument('--batch', action='store_true', help='check all the sections in parameters["sections"]')
+    parser.add_argument('--workers', type=int, default=8, help='sections checked at the same time in batch mode')
+    args = parser.parse_args()
+    if args.batch:
+        check_sections(parameters.get("sections", []), args.workers)
+    else:
+        check_section()
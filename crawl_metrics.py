@@ -0,0 +1,121 @@
+import json
+import threading
+import time
+
+
+class CrawlMetrics:
+    """Thread-safe counters, gauges and stage timings of a crawl.
+
+    Timings are kept as count/sum/max per stage (dns, connect, ttfb, download,
+    parse, check, throttle...), enough to tell if a crawl is network bound,
+    parse bound or waiting on the politeness delay.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.start_time = time.time()
+        self.counters = {}
+        self.statuses = {}
+        self.timings = {}
+        self.in_flight = 0
+        self.queue_depth = lambda: 0
+        self.reporter = None
+        self.stop_event = threading.Event()
+
+    def inc(self, name, value=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def status(self, status_code):
+        with self.lock:
+            self.statuses[status_code] = self.statuses.get(status_code, 0) + 1
+
+    def observe(self, stage, seconds):
+        with self.lock:
+            count, total, maximum = self.timings.get(stage, (0, 0.0, 0.0))
+            self.timings[stage] = (count + 1, total + seconds, max(maximum, seconds))
+
+    def request_started(self):
+        with self.lock:
+            self.in_flight += 1
+
+    def request_finished(self):
+        with self.lock:
+            self.in_flight -= 1
+
+    def snapshot(self):
+        """Return all the metrics as a JSON serializable dict."""
+        with self.lock:
+            elapsed = time.time() - self.start_time
+            return {
+                "elapsed_seconds": elapsed,
+                "queue_depth": self.queue_depth(),
+                "in_flight": self.in_flight,
+                "counters": dict(self.counters),
+                "statuses": {str(code): count for code, count in self.statuses.items()},
+                "timings": {
+                    stage: {"count": count, "sum": total, "max": maximum, "avg": total / count}
+                    for stage, (count, total, maximum) in self.timings.items()
+                },
+            }
+
+    def summary(self):
+        """One line summary of the crawl so far, for the periodic log."""
+        snapshot = self.snapshot()
+        pages = snapshot["counters"].get("pages", 0)
+        rate = pages / snapshot["elapsed_seconds"] if snapshot["elapsed_seconds"] else 0
+        timings = ", ".join(
+            f"{stage} {timing['avg'] * 1000:.0f}ms" for stage, timing in sorted(snapshot["timings"].items())
+        )
+        return (
+            f"{pages} pages ({rate:.1f}/s), queue {snapshot['queue_depth']}, in flight {snapshot['in_flight']}, "
+            f"retries {snapshot['counters'].get('retries', 0)}, "
+            f"{snapshot['counters'].get('bytes', 0) / 1024:.0f} KiB - avg {timings}"
+        )
+
+    def start_reporter(self, logger, interval):
+        """Log a summary every `interval` seconds until stop_reporter is called."""
+        def report():
+            while not self.stop_event.wait(interval):
+                logger.info(f"Metrics: {self.summary()}")
+
+        self.reporter = threading.Thread(target=report, daemon=True)
+        self.reporter.start()
+
+    def stop_reporter(self):
+        self.stop_event.set()
+        if self.reporter is not None:
+            self.reporter.join()
+
+    def prometheus(self):
+        """Return the metrics in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines = [
+            "# TYPE crawler_elapsed_seconds gauge",
+            f"crawler_elapsed_seconds {snapshot['elapsed_seconds']}",
+            "# TYPE crawler_queue_depth gauge",
+            f"crawler_queue_depth {snapshot['queue_depth']}",
+            "# TYPE crawler_in_flight gauge",
+            f"crawler_in_flight {snapshot['in_flight']}",
+        ]
+        for name, value in sorted(snapshot["counters"].items()):
+            lines.append(f"# TYPE crawler_{name}_total counter")
+            lines.append(f"crawler_{name}_total {value}")
+        lines.append("# TYPE crawler_responses_total counter")
+        for code, count in sorted(snapshot["statuses"].items()):
+            lines.append(f'crawler_responses_total{{status="{code}"}} {count}')
+        lines.append("# TYPE crawler_stage_seconds summary")
+        for stage, timing in sorted(snapshot["timings"].items()):
+            lines.append(f'crawler_stage_seconds_sum{{stage="{stage}"}} {timing["sum"]}')
+            lines.append(f'crawler_stage_seconds_count{{stage="{stage}"}} {timing["count"]}')
+        lines.append("# TYPE crawler_stage_seconds_max gauge")
+        for stage, timing in sorted(snapshot["timings"].items()):
+            lines.append(f'crawler_stage_seconds_max{{stage="{stage}"}} {timing["max"]}')
+        return "\n".join(lines) + "\n"
+
+    def dump(self, json_path, prometheus_path):
+        """Write the metrics as JSON and as Prometheus text."""
+        with open(json_path, "w") as f:
+            json.dump(self.snapshot(), f, indent=4)
+        with open(prometheus_path, "w") as f:
+            f.write(self.prometheus())
@@ -0,0 +1,70 @@
+import hashlib
+import json
+import re
+
+# URLs matching one of these regexes are not crawled nor reported
+DEFAULT_IGNORE = {
+    "sites": r"sites",
+    "facebook": r"facebook",
+    "events": r"\?q=events/",
+    "three_digits": r"\d{3}$",  # Links terminating with 3 digits
+}
+
+# Links containing one of these domains are reported as old URLs
+DEFAULT_OLD_DOMAINS = ["modena.esn.it", "esnmodena.it"]
+
+# A page has a name change if it contains an old name together with a new one
+DEFAULT_OLD_NAMES = ["esn modena"]
+DEFAULT_NEW_NAMES = ["esn modena and reggio emilia", "esn modena e reggio emilia", "esn more"]
+
+
+class RuleMatcher:
+    """Named rules compiled in a single alternation regex, so matching costs one scan however many rules there are.
+
+    The rules are regexes and must not define their own named groups.
+    """
+
+    def __init__(self, rules, flags=0):
+        self.names = list(rules)
+        alternatives = [f"(?P<r{i}>{regex})" for i, regex in enumerate(rules.values())]
+        # An empty alternation would match everything, use a regex that never matches instead
+        self.pattern = re.compile("|".join(alternatives) or r"(?!)", flags)
+
+    @classmethod
+    def from_literals(cls, literals, flags=0):
+        """Build a matcher of plain strings, each rule named after its string."""
+        return cls({literal: re.escape(literal) for literal in literals}, flags)
+
+    def search(self, text):
+        """Return the name of the first rule matching the text, or None."""
+        match = self.pattern.search(text)
+        if match is None:
+            return None
+        return self.names[int(match.lastgroup[1:])]
+
+
+class CrawlRules:
+    """Precompiled filtering and checking rules of the crawler."""
+
+    def __init__(self, ignore=None, old_domains=None, old_names=None, new_names=None):
+        self.ignore = RuleMatcher(DEFAULT_IGNORE if ignore is None else ignore)
+        self.old_domains = RuleMatcher.from_literals(DEFAULT_OLD_DOMAINS if old_domains is None else old_domains)
+        self.old_names = RuleMatcher.from_literals(DEFAULT_OLD_NAMES if old_names is None else old_names, re.IGNORECASE)
+        self.new_names = RuleMatcher.from_literals(DEFAULT_NEW_NAMES if new_names is None else new_names, re.IGNORECASE)
+
+    @classmethod
+    def from_parameters(cls, parameters):
+        """Build the rules from the optional "crawl_rules" entry of the parameters."""
+        rules = parameters.get("crawl_rules", {})
+        return cls(
+            ignore=rules.get("ignore"),
+            old_domains=rules.get("old_domains"),
+            old_names=rules.get("old_names"),
+            new_names=rules.get("new_names"),
+        )
+
+    def fingerprint(self):
+        """Hash of the compiled rules, changing whenever a rule does."""
+        matchers = [self.ignore, self.old_domains, self.old_names, self.new_names]
+        rules = [[matcher.names, matcher.pattern.pattern, matcher.pattern.flags] for matcher in matchers]
+        return hashlib.sha256(json.dumps(rules).encode()).hexdigest()
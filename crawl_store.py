@@ -0,0 +1,186 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from rate_limit import is_permanent_error
+
+QUEUED = "queued"
+PROCESSING = "processing"
+DONE = "done"
+FAILED = "failed"
+
+
+class CrawlStore:
+    """Crash-safe frontier and visited index of the crawler, stored in SQLite.
+
+    Every URL the crawler discovers gets a row with its state. Writes are grouped
+    in transactions of `batch_size` operations (or `flush_interval` seconds), so a
+    killed crawl loses at most the last batch, which is simply redone on resume.
+    """
+
+    def __init__(self, path, reset=False, batch_size=500, flush_interval=2.0):
+        if reset and os.path.exists(path):
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.pending_ops = 0
+        self.last_flush = time.monotonic()
+
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS urls ("
+            "url TEXT PRIMARY KEY, "
+            "state TEXT NOT NULL, "
+            "attempts INTEGER NOT NULL DEFAULT 0, "
+            "error TEXT, "
+            "status INTEGER)"
+        )
+        # Frontiers written before the status of the failures was stored
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(urls)")]
+        if "status" not in columns:
+            self.conn.execute("ALTER TABLE urls ADD COLUMN status INTEGER")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS urls_state ON urls(state)")
+        self.conn.execute("BEGIN")
+
+    def _write(self, query, args):
+        """Execute a write in the current batch, committing it when it is full or old."""
+        cursor = self.conn.execute(query, args)
+        self.pending_ops += 1
+        if self.pending_ops >= self.batch_size or time.monotonic() - self.last_flush > self.flush_interval:
+            self._commit()
+        return cursor.rowcount
+
+    def _commit(self):
+        self.conn.execute("COMMIT")
+        self.conn.execute("BEGIN")
+        self.pending_ops = 0
+        self.last_flush = time.monotonic()
+
+    def discover(self, url):
+        """Add a URL to the frontier. Return True if it was never seen before."""
+        with self.lock:
+            return self._write("INSERT OR IGNORE INTO urls (url, state) VALUES (?, ?)", (url, QUEUED)) == 1
+
+    def claim(self, url):
+        """Mark a URL as being processed. Return False if it was already claimed."""
+        with self.lock:
+            if self._write("UPDATE urls SET state = ? WHERE url = ? AND state = ?", (PROCESSING, url, QUEUED)) == 1:
+                return True
+            return self._write("INSERT OR IGNORE INTO urls (url, state) VALUES (?, ?)", (url, PROCESSING)) == 1
+
+    def mark_done(self, url):
+        with self.lock:
+            self._write("UPDATE urls SET state = ?, error = NULL WHERE url = ?", (DONE, url))
+
+    def mark_failed(self, url, error_message, status_code=None):
+        """Mark a URL as failed, with the HTTP status of the last attempt if there was a response."""
+        with self.lock:
+            self._write(
+                "UPDATE urls SET state = ?, attempts = attempts + 1, error = ?, status = ? WHERE url = ?",
+                (FAILED, error_message, status_code, url),
+            )
+
+    def resume(self, max_failures=3):
+        """Put back in the frontier the URLs interrupted or failed in a previous run and return the frontier.
+
+        The URLs that failed with a permanent error (e.g. 404) are not retried.
+        """
+        with self.lock:
+            self.conn.execute("UPDATE urls SET state = ? WHERE state = ?", (QUEUED, PROCESSING))
+            failed = self.conn.execute(
+                "SELECT url, status FROM urls WHERE state = ? AND attempts < ?", (FAILED, max_failures)
+            ).fetchall()
+            self.conn.executemany(
+                "UPDATE urls SET state = ? WHERE url = ?",
+                [(QUEUED, url) for url, status in failed if not is_permanent_error(status)],
+            )
+            self._commit()
+            cursor = self.conn.execute("SELECT url FROM urls WHERE state = ?", (QUEUED,))
+            return [row[0] for row in cursor]
+
+    def __contains__(self, url):
+        """True if the URL has been claimed, whatever the outcome."""
+        with self.lock:
+            row = self.conn.execute("SELECT state FROM urls WHERE url = ?", (url,)).fetchone()
+        return row is not None and row[0] != QUEUED
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM urls WHERE state != ?", (QUEUED,)).fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self.conn.execute("COMMIT")
+            self.conn.close()
+
+
+class PageCache:
+    """HTTP validators, content hash and analysis of every crawled page, stored in SQLite.
+
+    The analysis is what the crawler extracted from the page (links, name change,
+    old URL findings), so unchanged pages don't need to be parsed again. The cached
+    pages are dropped when fingerprint (what the analysis is made with) changes.
+    """
+
+    def __init__(self, path, fingerprint=None, batch_size=100):
+        self.batch_size = batch_size
+        self.lock = threading.Lock()
+        self.pending_ops = 0
+
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            "url TEXT PRIMARY KEY, "
+            "etag TEXT, "
+            "last_modified TEXT, "
+            "content_hash TEXT NOT NULL, "
+            "page TEXT NOT NULL)"
+        )
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'fingerprint'").fetchone()
+        if row is None or row[0] != fingerprint:
+            self.conn.execute("DELETE FROM pages")
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('fingerprint', ?)", (fingerprint,))
+        self.conn.execute("BEGIN")
+
+    def get(self, url):
+        """Return the cached entry of a URL as a dict, or None."""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT etag, last_modified, content_hash, page FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "etag": row[0],
+            "last_modified": row[1],
+            "content_hash": row[2],
+            "page": json.loads(row[3]),
+        }
+
+    def put(self, url, etag, last_modified, content_hash, page):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO pages (url, etag, last_modified, content_hash, page) VALUES (?, ?, ?, ?, ?)",
+                (url, etag, last_modified, content_hash, json.dumps(page)),
+            )
+            self.pending_ops += 1
+            if self.pending_ops >= self.batch_size:
+                self.conn.execute("COMMIT")
+                self.conn.execute("BEGIN")
+                self.pending_ops = 0
+
+    def close(self):
+        with self.lock:
+            self.conn.execute("COMMIT")
+            self.conn.close()
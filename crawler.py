@@ -1,32 +1,57 @@
 import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse
+from urllib.parse import urlparse
 import concurrent.futures
 import queue
 import threading
 import time
 import logging
 import os
-import re
+import hashlib
 from parameters import parameters
+from crawl_store import CrawlStore, PageCache
+from crawl_rules import CrawlRules
+from page_analysis import PageAnalyzer, init_worker, analyze_in_worker
+from crawl_metrics import CrawlMetrics
+from rate_limit import AdaptiveRateLimiter, THROTTLE_STATUSES, is_permanent_error, parse_retry_after
+from sitemap import fetch_robots, sitemap_urls, parse_http_date
 
-# Create crawler directory if it doesn't exist
-os.makedirs("crawler", exist_ok=True)
-
-# Set up logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("crawler/crawler.log"),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger("crawler")
 
+
+def configure_logging():
+    """Log to crawler/crawler.log and to the console. Called by the command line, not on import."""
+    os.makedirs("crawler", exist_ok=True)
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler("crawler/crawler.log"),
+            logging.StreamHandler()
+        ]
+    )
+
 class WebCrawler:
-    def __init__(self, start_url, max_workers=10, timeout=10, max_retries=3, delay=0.5, use_txt=False):
-        """Initialize the web crawler with configurable parameters."""
+    def __init__(self, start_url, max_workers=10, timeout=10, max_retries=3, delay=0.5, use_txt=False,
+                 frontier=None, page_cache=None, parser="bs4", rules=None, processes=0, metrics_interval=30,
+                 max_rate=None, sitemap=False, robots=False):
+        """Initialize the web crawler with configurable parameters.
+        
+        frontier is the path of an optional SQLite store keeping the queued, visited and failed URLs,
+        so that a crawl resumed with use_txt starts exactly where the previous one stopped.
+        page_cache is the path of an optional SQLite cache of the pages, used to revalidate them
+        with conditional requests and to skip parsing the ones that didn't change.
+        parser is the HTML backend: "bs4" (BeautifulSoup) or "fast" (single pass html.parser scanner).
+        rules are the precompiled CrawlRules used to filter URLs and check pages.
+        processes is the number of worker processes parsing the pages (0 parses them in the fetching threads).
+        metrics_interval is the number of seconds between two metrics summaries in the log (0 disables them).
+        The requests are paced by an adaptive rate limiter shared by all the workers: it starts at
+        max_workers / delay requests per second and moves between 0.5 and max_rate (default 4 times that)
+        following the server response times, 429/503 responses and Retry-After headers.
+        sitemap seeds the queue with the pages listed in the sitemaps of the site (from robots.txt or
+        /sitemap.xml), the ones changed since they were cached first. robots skips the URLs disallowed
+        by robots.txt."""
+        # The output files, the log and the default stores live in crawler/
+        os.makedirs("crawler", exist_ok=True)
         self.start_url = start_url
         self.base_domain = urlparse(start_url).netloc
         self.visited = set()
@@ -36,17 +61,40 @@ class WebCrawler:
         self.timeout = timeout
         self.max_retries = max_retries
         self.delay = delay
+        self.rate_limiter = AdaptiveRateLimiter(max_workers / delay if delay else 100, max_rate=max_rate)
         self.use_txt = use_txt
+        self.sitemap = sitemap
+        self.respect_robots = robots
+        self.robots = None
+        self.analyzer = PageAnalyzer(self.base_domain, parser, rules or CrawlRules())
+        
+        # Fetching stays in the threads, parsing and checks go to the process pool
+        self.process_pool = None
+        if processes:
+            self.process_pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=processes, initializer=init_worker, initargs=(self.analyzer,)
+            )
         self.results = {
             "name_changes": [],
             "old_urls": []
         }
         self.results_lock = threading.Lock()
+        # Set when the crawl is interrupted: the workers drop the queued URLs instead of fetching them
+        self.stopping = threading.Event()
+        self.metrics = CrawlMetrics()
+        self.metrics_interval = metrics_interval
         
         # File locks for thread-safe writing
         self.error_file_lock = threading.Lock()
         self.checked_file_lock = threading.Lock()
         
+        # The persistent store replaces the in-memory visited set
+        self.store = None
+        if frontier:
+            self.store = CrawlStore(frontier, reset=not self.use_txt)
+            self.visited = self.store
+        self.page_cache = PageCache(page_cache, self.analyzer.fingerprint()) if page_cache else None
+        
         # Initialize files or load from existing
         if not self.use_txt or not os.path.exists("crawler/checked.txt"):
             # Initialize new files
@@ -55,7 +103,7 @@ class WebCrawler:
             
             with open("crawler/checked.txt", "w") as f:
                 f.write("# Successfully checked URLs\n")
-        else:
+        elif self.store is None:
             # Load previously checked URLs
             logger.info("Loading previously checked URLs from checked.txt")
             try:
@@ -67,40 +115,30 @@ class WebCrawler:
                 logger.info(f"Loaded {len(self.visited)} previously checked URLs")
             except Exception as e:
                 logger.error(f"Error loading checked.txt: {str(e)}")
-
-    def should_ignore_url(self, url):
-        """Check if URL should be ignored based on filtering rules."""
-        if 'sites' in url:
-            return True
         
-        if 'facebook' in url:
-            return True
-        
-        if '?q=events/' in url:
-            return True
-        
-        # Use regex to filter out links containing *sites*
-        if re.search(r'sites', url):
-            return True
+        # Keep the output files open instead of reopening them for every page
+        self.error_file = open("crawler/error.txt", "a", buffering=1)
+        self.checked_file = open("crawler/checked.txt", "a", buffering=1)
 
-            
-        # Ignore all links terminating with 3 digits
-        if re.search(r'\d{3}$', url):
-            return True
-            
-        return False
+    def should_ignore_url(self, url):
+        """Check if URL should be ignored based on filtering rules. Return the name of the rule that fired."""
+        if self.robots is not None and not self.robots.can_fetch("*", url):
+            return "robots.txt"
+        return self.analyzer.should_ignore_url(url)
 
-    def save_error_url(self, url, error_message):
+    def save_error_url(self, url, error_message, status_code=None):
         """Save a URL that failed to be processed to error.txt."""
         with self.error_file_lock:
-            with open("crawler/error.txt", "a") as f:
-                f.write(f"{url} - {error_message}\n")
+            self.error_file.write(f"{url} - {error_message}\n")
+        if self.store is not None:
+            self.store.mark_failed(url, error_message, status_code)
     
     def save_checked_url(self, url):
         """Save a successfully checked URL to checked.txt."""
         with self.checked_file_lock:
-            with open("crawler/checked.txt", "a") as f:
-                f.write(f"{url}\n")
+            self.checked_file.write(f"{url}\n")
+        if self.store is not None:
+            self.store.mark_done(url)
 
     def save_old_urls(self, url, findings):
         """Save old URLs found in the page."""
@@ -108,169 +146,320 @@ class WebCrawler:
             with open("crawler/old_urls.txt", "a") as f:
                 f.write(f"{url} - {findings}\n")
 
-    def check_name_change(self, text, url):
-        """Check if there's a name change in the text."""
-        text = text.lower()
-        if 'esn modena' in text:
-            if any(new_name in text for new_name in ['esn modena and reggio emilia', 'esn modena e reggio emilia', 'esn more']):
-                with self.results_lock:
-                    self.results["name_changes"].append(url)
-                return True
-        return False
+    def analyze_page(self, url, content):
+        """Parse a fetched page and run the checks, in the process pool if there is one.
+        
+        Return a page dict with the links it contains and the findings, ready to be cached."""
+        if self.process_pool is not None:
+            page, parse_time, check_time = self.process_pool.submit(analyze_in_worker, url, content).result()
+        else:
+            page, parse_time, check_time = self.analyzer.analyze_timed(url, content)
+        self.metrics.observe("parse", parse_time)
+        self.metrics.observe("check", check_time)
+        return page
+
+    def cached_page(self, url):
+        """Return the page cache entry of the URL, if any."""
+        if self.page_cache is None:
+            return None
+        return self.page_cache.get(url)
+
+    def conditional_headers(self, cached):
+        """Build the If-None-Match/If-Modified-Since headers to revalidate a cached page."""
+        headers = {}
+        if cached is not None:
+            if cached["etag"]:
+                headers["If-None-Match"] = cached["etag"]
+            if cached["last_modified"]:
+                headers["If-Modified-Since"] = cached["last_modified"]
+        return headers
 
-    def check_correct_url(self, text, soup, current_url):
-        """Check if old URLs are present in text or links."""
-        old_urls = ["modena.esn.it", "http://modena.esn.it", "https://modena.esn.it", "esnmodena.it", "http://esnmodena.it", "https://esnmodena.it"]
-        findings = []
+    def page_from_response(self, url, status_code, content, headers, cached):
+        """Return the page dict of a response, reusing the cached one if the page didn't change."""
+        if status_code == 304 and cached is not None:
+            logger.info(f"Not modified: {url}")
+            self.metrics.inc("not_modified")
+            return cached["page"]
         
+        content_hash = hashlib.sha256(content).hexdigest()
+        if cached is not None and cached["content_hash"] == content_hash:
+            logger.info(f"Unchanged content: {url}")
+            self.metrics.inc("unchanged")
+            page = cached["page"]
+        else:
+            page = self.analyze_page(url, content)
+            self.metrics.inc("parsed")
         
-        # Check in href attributes
-        for a_tag in soup.find_all('a', href=True):
-            if any(url in a_tag['href'] for url in old_urls) and not self.should_ignore_url(a_tag['href']):
-                findings.append(f"Found in link: {a_tag['href']}")
+        if self.page_cache is not None:
+            self.page_cache.put(url, headers.get("ETag"), headers.get("Last-Modified"), content_hash, page)
+        return page
+
+    def record_page(self, url, page):
+        """Save the findings of a page and queue its links."""
+        if page["name_change"]:
+            logger.info(f"Name change ({page['name_change']}) found at {url}")
+            with self.results_lock:
+                self.results["name_changes"].append(url)
         
-        if findings:
+        if page["old_urls"]:
             with self.results_lock:
                 self.results["old_urls"].append({
-                    "url": current_url,
-                    "findings": findings
+                    "url": url,
+                    "findings": page["old_urls"]
                 })
-            return findings
-        
-        return False
-
-    def extract_links(self, current_url, soup):
-        """Extract links from the page that belong to the same domain."""
-        links = set()
-        for a_tag in soup.find_all('a', href=True):
-            href = a_tag['href']
-            full_url = urljoin(current_url, href)
-            
-            # Parse URL to check domain and filter out fragments
-            parsed_url = urlparse(full_url)
-            
-            # Only process URLs from the same domain and ignore fragments
-            if parsed_url.netloc == self.base_domain and not parsed_url.fragment:
-                # Remove fragments and normalize URL
-                clean_url = f"{parsed_url.scheme}://{parsed_url.netloc}{parsed_url.path}"
-                if parsed_url.query:
-                    clean_url += f"?{parsed_url.query}"
-                
-                links.add(clean_url)
-
+            logger.warning(f"Old URL references found at {url}: {page['old_urls']}")
+            self.save_old_urls(url, page["old_urls"])
         
-        return links
+        self.enqueue_links(page["links"])
 
-    def process_url(self, url):
-        """Process a single URL: fetch content, analyze, and extract new links."""
+    def claim_url(self, url):
+        """Return True if the URL has to be processed, marking it as visited."""
         if not url:
-            return
+            return False
         
         # Skip if URL should be ignored
-        if self.should_ignore_url(url):
-            logger.debug(f"Skipping filtered URL: {url}")
-            return
+        rule = self.should_ignore_url(url)
+        if rule is not None:
+            logger.debug(f"Skipping filtered URL: {url} (rule {rule})")
+            return False
         
         # Skip if URL has already been processed
+        if self.store is not None:
+            return self.store.claim(url)
         with self.visited_lock:
             if url in self.visited:
-                return
+                return False
             self.visited.add(url)
+        return True
+
+    def enqueue(self, url):
+        """Add a URL to the queue of pages to visit."""
+        self.queue.put(url)
+
+    def enqueue_links(self, links):
+        """Add the links that have not been visited yet to the queue."""
+        for link in links:
+            if self.store is not None:
+                # The store also remembers the queued URLs, so each link is queued only once
+                if self.should_ignore_url(link) is None and self.store.discover(link):
+                    self.enqueue(link)
+                continue
+            with self.visited_lock:
+                if link in self.visited:
+                    continue
+            self.enqueue(link)
+
+    def handle_status(self, status_code, headers, latency):
+        """Feed a response status and its time to first byte to the metrics and the rate limiter."""
+        self.metrics.observe("ttfb", latency)
+        self.metrics.status(status_code)
+        if status_code in THROTTLE_STATUSES:
+            retry_after = parse_retry_after(headers.get("Retry-After"))
+            logger.warning(f"Server answered {status_code}, slowing down" +
+                           (f" and pausing {retry_after:.0f}s" if retry_after else ""))
+            self.metrics.inc("throttled")
+            self.rate_limiter.on_throttle(retry_after)
+        elif status_code >= 500:
+            # An overloaded or failing server shouldn't be hit as fast by the retries
+            logger.warning(f"Server answered {status_code}, slowing down")
+            self.metrics.inc("throttled")
+            self.rate_limiter.on_throttle()
+        elif status_code < 400:
+            self.rate_limiter.on_success(latency)
+
+    def process_url(self, url):
+        """Process a single URL: fetch content, analyze, and extract new links."""
+        if not self.claim_url(url):
+            return
         
         logger.info(f"Processing: {url}")
         
         # Try to fetch the page with retries
         success = False
         error_message = ""
+        status_code = None
+        cached = self.cached_page(url)
         
         for attempt in range(self.max_retries):
+            if attempt:
+                self.metrics.inc("retries")
+            # Wait for the rate limiter shared by all the workers
+            self.metrics.observe("throttle", self.rate_limiter.wait())
+            status_code = None
             try:
-                response = requests.get(url, timeout=self.timeout)
-                response.raise_for_status()  # Raise exception for 4XX/5XX responses
-                
-                soup = BeautifulSoup(response.content, 'html.parser')
-                text = soup.get_text()
-                
-                # Check for name changes
-                self.check_name_change(text, url)
-                
-                # Check for old URLs
-                url_findings = self.check_correct_url(text, soup, url)
-                if url_findings:
-                    logger.warning(f"Old URL references found at {url}: {url_findings}")
-                    self.save_old_urls(url, url_findings)
+                self.metrics.inc("requests")
+                start = time.perf_counter()
+                with requests.get(url, timeout=self.timeout, headers=self.conditional_headers(cached), stream=True) as response:
+                    # With stream=True get returns as soon as the headers are read. There are no
+                    # DNS/connect hooks here, so this time to first byte includes the connection setup
+                    headers_time = time.perf_counter()
+                    status_code = response.status_code
+                    self.handle_status(status_code, response.headers, headers_time - start)
+                    response.raise_for_status()  # Raise exception for 4XX/5XX responses
+                    content = response.content
+                    self.metrics.observe("download", time.perf_counter() - headers_time)
+                    self.metrics.inc("bytes", len(content))
                 
-                # Extract new links and add them to the queue
-                links = self.extract_links(url, soup)
-                for link in links:
-                    with self.visited_lock:
-                        if link not in self.visited:
-                            self.queue.put(link)
+                # Save the findings and add the new links to the queue
+                page = self.page_from_response(url, response.status_code, content, response.headers, cached)
+                self.record_page(url, page)
                 
                 # Mark as successful and save to checked.txt
                 success = True
                 self.save_checked_url(url)
-                
-                # Add delay to be nice to the server
-                time.sleep(self.delay)
+                self.metrics.inc("pages")
                 break  # Exit retry loop on success
                 
             except requests.exceptions.RequestException as e:
                 error_message = str(e)
+                self.metrics.inc("errors")
+                if isinstance(e, (requests.exceptions.Timeout, requests.exceptions.ConnectionError)):
+                    self.rate_limiter.on_throttle()
                 logger.error(f"Error fetching {url} (attempt {attempt+1}/{self.max_retries}): {error_message}")
+                if is_permanent_error(status_code):
+                    logger.error(f"Not retrying {url}: permanent error {status_code}")
+                    break
                 if attempt == self.max_retries - 1:
                     logger.error(f"Failed to process {url} after {self.max_retries} attempts")
-                else:
-                    time.sleep(self.delay * (attempt + 1))  # Exponential backoff
         
         # If all retries failed, save to error.txt
         if not success:
-            self.save_error_url(url, error_message)
+            self.save_error_url(url, error_message, status_code)
+            self.metrics.inc("failed")
     
     def worker(self):
-        """Worker function that processes URLs from the queue."""
+        """Long-lived worker that processes URLs from the queue until it gets a stop sentinel."""
         while True:
-            try:
-                url = self.queue.get(block=False)
-                self.process_url(url)
+            url = self.queue.get()
+            if url is None:
                 self.queue.task_done()
-            except queue.Empty:
                 break
+            if self.stopping.is_set():
+                self.queue.task_done()
+                continue
+            self.metrics.request_started()
+            try:
+                self.process_url(url)
             except Exception as e:
                 logger.error(f"Unexpected error in worker: {str(e)}")
                 # Save unexpected errors to error file too
-                self.save_error_url(url if 'url' in locals() else "unknown_url", f"Unexpected error: {str(e)}")
+                self.save_error_url(url, f"Unexpected error: {str(e)}")
+            finally:
+                self.metrics.request_finished()
+                # Links found by process_url are queued before this, so the
+                # unfinished task count only reaches zero when the crawl is over
                 self.queue.task_done()
     
+    def initial_urls(self):
+        """Return the URLs the crawl starts from: the start URL, the stored frontier when resuming and the sitemap pages."""
+        if self.respect_robots or self.sitemap:
+            robots = fetch_robots(requests.Session(), self.start_url, self.timeout)
+            if self.respect_robots:
+                self.robots = robots
+        
+        urls = []
+        if self.store is not None:
+            if self.use_txt:
+                urls = self.store.resume(self.max_retries)
+                logger.info(f"Resuming with {len(urls)} queued URLs")
+            if self.store.discover(self.start_url):
+                urls.append(self.start_url)
+        else:
+            # Add the starting URL to the queue if not already visited
+            with self.visited_lock:
+                if self.start_url not in self.visited:
+                    urls.append(self.start_url)
+        
+        if self.sitemap:
+            urls.extend(self.sitemap_seeds(robots, set(urls)))
+        return urls
+
+    def sitemap_seeds(self, robots, queued):
+        """Read the sitemaps and return the pages to queue, the ones changed since they were cached first."""
+        changed, unchanged = [], []
+        for loc, lastmod in sitemap_urls(requests.Session(), self.start_url, robots, self.timeout):
+            # Normalize the URL like the links found in the pages, dropping other domains
+            for url in self.analyzer.extract_links(self.start_url, [loc]):
+                if url in queued or self.should_ignore_url(url) is not None:
+                    continue
+                if self.store is not None:
+                    if not self.store.discover(url):
+                        continue
+                elif url in self.visited:
+                    continue
+                queued.add(url)
+                
+                cached = self.cached_page(url)
+                cached_date = parse_http_date(cached["last_modified"]) if cached else None
+                if lastmod and cached_date and lastmod <= cached_date:
+                    unchanged.append(url)
+                else:
+                    changed.append(url)
+        
+        logger.info(f"Seeded {len(changed) + len(unchanged)} URLs from the sitemaps "
+                    f"({len(unchanged)} unchanged since the last crawl)")
+        return changed + unchanged
+
+    def start_metrics(self, queue_depth):
+        """Start the periodic metrics summaries, reading the queue depth with the given function."""
+        self.metrics.queue_depth = queue_depth
+        if self.metrics_interval:
+            self.metrics.start_reporter(logger, self.metrics_interval)
+
+    def stop_metrics(self):
+        """Stop the periodic summaries and dump the metrics to crawler/metrics.json and crawler/metrics.prom."""
+        self.metrics.stop_reporter()
+        logger.info(f"Metrics: {self.metrics.summary()}")
+        self.metrics.dump("crawler/metrics.json", "crawler/metrics.prom")
+
+    def close(self):
+        """Close the output files and flush the persistent store."""
+        self.error_file.close()
+        self.checked_file.close()
+        if self.process_pool is not None:
+            self.process_pool.shutdown()
+        if self.page_cache is not None:
+            self.page_cache.close()
+        if self.store is not None:
+            logger.info(f"Visited {len(self.store)} pages")
+            self.store.close()
+
     def crawl(self):
         """Start the crawling process with multiple threads."""
         start_time = time.time()
         logger.info(f"Starting crawl from {self.start_url} with {self.max_workers} workers")
         logger.info(f"Using checked.txt for previously visited URLs: {self.use_txt}")
         
-        # Add the starting URL to the queue if not already visited
-        with self.visited_lock:
-            if self.start_url not in self.visited:
-                self.queue.put(self.start_url)
-        
-        # Create and start worker threads
-        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            # Start initial batch of workers
-            workers = [executor.submit(self.worker) for _ in range(self.max_workers)]
-            
-            # Monitor queue and add more workers as needed
-            while not self.queue.empty() or any(not worker.done() for worker in workers):
-                active_workers = sum(1 for worker in workers if not worker.done())
-                if active_workers < self.max_workers:
-                    # Add more workers if needed
-                    new_workers = [executor.submit(self.worker) 
-                                 for _ in range(self.max_workers - active_workers)]
-                    workers.extend(new_workers)
-                time.sleep(0.5)
+        for url in self.initial_urls():
+            self.queue.put(url)
+        self.start_metrics(self.queue.qsize)
         
+        try:
+            # Start a fixed pool of worker threads
+            with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                workers = [executor.submit(self.worker) for _ in range(self.max_workers)]
+
+                try:
+                    # Wait until every queued URL (including the ones discovered meanwhile) is processed
+                    self.queue.join()
+                finally:
+                    # Stop the workers, also on Ctrl-C: the URLs left stay queued in the frontier for a resume
+                    self.stopping.set()
+                    for _ in workers:
+                        self.queue.put(None)
+        finally:
+            # Flush the stores and the output files even if the crawl was interrupted
+            self.stop_metrics()
+            self.close()
+        self.report(start_time)
+        return self.results
+
+    def report(self, start_time):
+        """Log the summary of a finished crawl."""
         elapsed_time = time.time() - start_time
         logger.info(f"Crawl completed in {elapsed_time:.2f} seconds")
-        logger.info(f"Visited {len(self.visited)} pages")
+        if self.store is None:
+            logger.info(f"Visited {len(self.visited)} pages")
         
         # Count successes and failures
         with open("crawler/checked.txt") as f:
@@ -294,26 +483,55 @@ class WebCrawler:
                 logger.info(f"  - {item['url']}")
                 for finding in item['findings']:
                     logger.info(f"    * {finding}")
-        
-        return self.results
 
-if __name__ == '__main__':
+def main():
+    configure_logging()
     # Get settings from parameters file
     start_url = parameters["website"]
     max_workers = parameters.get("max_workers", 10)
     timeout = parameters.get("timeout", 10)
     max_retries = parameters.get("max_retries", 3)
-    delay = parameters.get("delay", 0.5)
+    delay = parameters.get("delay", 0.5)  # Sets the initial request rate to max_workers / delay, then it adapts
+    max_rate = parameters.get("max_rate")  # Maximum requests per second
     use_txt = parameters.get("use_txt", False)  # Option to use checked.txt for already explored sites
+    page_cache = parameters.get("page_cache")  # Path of the SQLite page cache used for incremental recrawls, e.g. "crawler/pages.sqlite"
+    parser = parameters.get("parser", "bs4")  # "bs4" or "fast"
+    processes = parameters.get("processes", 0)  # Worker processes parsing the pages, 0 to parse in the fetching threads
+    metrics_interval = parameters.get("metrics_interval", 30)  # Seconds between metrics summaries in the log
+    sitemap = parameters.get("sitemap", False)  # Seed the crawl with the pages listed in the sitemaps
+    robots = parameters.get("robots", False)  # Skip the URLs disallowed by robots.txt
+    frontier = parameters.get("frontier")  # Path of the SQLite store used to resume crawls, e.g. "crawler/frontier.sqlite"
+    
+    engine = parameters.get("engine", "threads")  # "threads" or "async"
+    crawler_class = WebCrawler
+    engine_options = {}
+    if engine == "async":
+        from async_crawler import AsyncWebCrawler
+        crawler_class = AsyncWebCrawler
+        engine_options["per_host_limit"] = parameters.get("per_host_limit")
     
     # Initialize and run the crawler
-    crawler = WebCrawler(
+    crawler = crawler_class(
         start_url=start_url,
         max_workers=max_workers,
         timeout=timeout,
         max_retries=max_retries,
         delay=delay,
-        use_txt=use_txt
+        use_txt=use_txt,
+        frontier=frontier,
+        page_cache=page_cache,
+        parser=parser,
+        rules=CrawlRules.from_parameters(parameters),
+        processes=processes,
+        metrics_interval=metrics_interval,
+        max_rate=max_rate,
+        sitemap=sitemap,
+        robots=robots,
+        **engine_options
     )
     
-    results = crawler.crawl()
\ No newline at end of file
+    results = crawler.crawl()
+
+
+if __name__ == '__main__':
+    main()
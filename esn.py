@@ -0,0 +1,66 @@
+"""Command line of the ESN tools.
+
+    python esn.py diff [--batch] [--workers N]
+    python esn.py birthdays [--days N | --month]
+    python esn.py photos
+    python esn.py crawl
+
+Every command imports its module (and requests, pandas, PIL...) only when it runs,
+so the help and the quick commands start immediately.
+"""
+import argparse
+
+
+def diff(args):
+    import checks_for_differences
+    from parameters import parameters
+
+    if args.batch:
+        checks_for_differences.check_sections(parameters.get("sections", []), args.workers)
+    else:
+        checks_for_differences.check_section()
+
+
+def birthdays(args):
+    import birthdays
+
+    birthdays.main(args.days, args.month)
+
+
+def photos(args):
+    import members_from_photos
+
+    members_from_photos.main()
+
+
+def crawl(args):
+    import crawler
+
+    crawler.main()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="esn.py", description="ESN section tools: members, birthdays, photos and website checks.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    diff_parser = subparsers.add_parser("diff", help="compare the members on Jupiter with the members on the website")
+    diff_parser.add_argument('--batch', action='store_true', help='check all the sections in parameters["sections"]')
+    diff_parser.add_argument('--workers', type=int, default=8, help='sections checked at the same time in batch mode')
+    diff_parser.set_defaults(run=diff)
+
+    birthdays_parser = subparsers.add_parser("birthdays", help="list the birthdays and generate the calendar")
+    birthdays_parser.add_argument('--days', type=int, help='only list the birthdays of the next DAYS days')
+    birthdays_parser.add_argument('--month', action='store_true', help='only list the birthdays of this month')
+    birthdays_parser.set_defaults(run=birthdays)
+    subparsers.add_parser("photos", help="process the photos and generate the About Us HTML").set_defaults(run=photos)
+    subparsers.add_parser("crawl", help="crawl the website looking for old URLs and names").set_defaults(run=crawl)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.run(args)
+
+
+if __name__ == '__main__':
+    main()
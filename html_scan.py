@@ -0,0 +1,87 @@
+from html.parser import HTMLParser
+
+from bs4 import BeautifulSoup
+from bs4.dammit import EncodingDetector
+
+# Tags whose content is not visible text (BeautifulSoup's get_text() skips them too)
+INVISIBLE_TAGS = {"script", "style", "template"}
+
+
+class PageScanner(HTMLParser):
+    """Collect links, visible text and links to the old domains of a page in a single pass.
+
+    old_domains is a crawl_rules.RuleMatcher, old_url_hrefs gets (href, rule) pairs.
+    """
+
+    def __init__(self, old_domains):
+        super().__init__(convert_charrefs=True)
+        self.old_domains = old_domains
+        self.hrefs = []
+        self.old_url_hrefs = []
+        self.text_parts = []
+        self.invisible_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in INVISIBLE_TAGS:
+            self.invisible_depth += 1
+        elif tag == "a":
+            for name, value in attrs:
+                if name == "href":
+                    value = value or ""
+                    self.hrefs.append(value)
+                    rule = self.old_domains.search(value)
+                    if rule is not None:
+                        self.old_url_hrefs.append((value, rule))
+                    break
+
+    def handle_endtag(self, tag):
+        if tag in INVISIBLE_TAGS and self.invisible_depth:
+            self.invisible_depth -= 1
+
+    def handle_data(self, data):
+        if not self.invisible_depth:
+            self.text_parts.append(data)
+
+
+def decode_html(content):
+    """Decode a page the way BeautifulSoup does: byte order mark, then <meta charset> or XML
+    declaration, then UTF-8 and Windows-1252, so both backends see the same text."""
+    content, encoding = EncodingDetector.strip_byte_order_mark(content)
+    encoding = encoding or EncodingDetector.find_declared_encoding(content, is_html=True)
+    for candidate in (encoding, "utf-8", "windows-1252"):
+        if candidate is None:
+            continue
+        try:
+            return content.decode(candidate)
+        except (LookupError, UnicodeDecodeError):
+            pass
+    return content.decode("utf-8", errors="replace")
+
+
+def scan_html(content, old_domains):
+    """Scan a page with PageScanner. Return its text, its hrefs and the (href, rule) pairs of the old domains."""
+    if isinstance(content, bytes):
+        content = decode_html(content)
+    scanner = PageScanner(old_domains)
+    scanner.feed(content)
+    scanner.close()
+    return "".join(scanner.text_parts), scanner.hrefs, scanner.old_url_hrefs
+
+
+def scan_html_bs4(content, old_domains):
+    """Same as scan_html, building a BeautifulSoup tree. Slower, but more tolerant of broken markup."""
+    soup = BeautifulSoup(content, 'html.parser')
+    hrefs = [a_tag['href'] for a_tag in soup.find_all('a', href=True)]
+    old_url_hrefs = []
+    for href in hrefs:
+        rule = old_domains.search(href)
+        if rule is not None:
+            old_url_hrefs.append((href, rule))
+    return soup.get_text(), hrefs, old_url_hrefs
+
+
+# Parser backends selectable with the "parser" parameter
+PARSERS = {
+    "fast": scan_html,
+    "bs4": scan_html_bs4,
+}
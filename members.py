@@ -0,0 +1,107 @@
+import os
+
+from names import name_key, replace_multiple_spaces_with_single_space
+
+
+class Member:
+    """A member of the section, as read from Jupiter, the website or the photos."""
+
+    __slots__ = ("name", "key", "category", "birthdate", "photo")
+
+    def __init__(self, name, category=None, birthdate=None, photo=None):
+        self.name = replace_multiple_spaces_with_single_space(name)
+        self.key = name_key(name)
+        self.category = category
+        self.birthdate = birthdate
+        self.photo = photo
+
+    def __repr__(self):
+        return f"Member({self.name!r}, category={self.category!r})"
+
+
+class MemberSet:
+    """Members indexed by canonical name key and by category.
+
+    A member is added only once: later members with the same key are ignored,
+    so the order of insertion decides which category wins.
+    """
+
+    def __init__(self, members=()):
+        self.by_key = {}
+        self.by_category = {}
+        for member in members:
+            self.add(member)
+
+    def add(self, member):
+        """Add a member, returning the one already present with the same key if any."""
+        if member.key in self.by_key:
+            return self.by_key[member.key]
+        self.by_key[member.key] = member
+        self.by_category.setdefault(member.category, []).append(member)
+        return member
+
+    def get(self, name):
+        """Return the member with the same key as the name, or None."""
+        return self.by_key.get(name_key(name))
+
+    def __contains__(self, name):
+        return name_key(name) in self.by_key
+
+    def __iter__(self):
+        return iter(self.by_key.values())
+
+    def __len__(self):
+        return len(self.by_key)
+
+    def category(self, category):
+        """Return the members of a category."""
+        return self.by_category.get(category, [])
+
+    def names(self, category):
+        """Return the names of the members of a category."""
+        return [member.name for member in self.category(category)]
+
+    def merge_category(self, source, target):
+        """Move all the members of the source category to the target one."""
+        for member in self.by_category.pop(source, []):
+            member.category = target
+            self.by_category.setdefault(target, []).append(member)
+
+    def to_dict(self):
+        """Return the names grouped by category, e.g. to save them as JSON."""
+        return {category: [member.name for member in members] for category, members in self.by_category.items()}
+
+    @classmethod
+    def from_categories(cls, names_by_category, skip_esn=True):
+        """Build the set from a dict of category -> names, in the order of the dict.
+
+        Accounts of the section (names containing "ESN") are skipped by default.
+        """
+        member_set = cls()
+        for category, names in names_by_category.items():
+            for name in names:
+                if skip_esn and "ESN" in name.upper():
+                    continue
+                member_set.add(Member(name, category))
+        return member_set
+
+    @classmethod
+    def from_dataframe(cls, members, skip_esn=True):
+        """Build the set from the DataFrame of members_xlsx.load_members_xlsx."""
+        member_set = cls()
+        for name, birthdate, category in zip(members["name"], members["birthdate"], members["category"]):
+            if skip_esn and "ESN" in name.upper():
+                continue
+            # Missing birthdates are NaT, which is not equal to itself
+            member_set.add(Member(name, category, None if birthdate != birthdate else birthdate))
+        return member_set
+
+    @classmethod
+    def from_photos(cls, path, extension='.jpg'):
+        """Build the set from photos saved as NAME_SURNAME.EXT."""
+        member_set = cls()
+        for file in sorted(os.listdir(path)):
+            if file.endswith(extension):
+                name = file[:-len(extension)].replace('_', ' ')
+                member_set.add(Member(name, photo=file.lower()))
+        return member_set
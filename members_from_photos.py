@@ -1,75 +1,339 @@
 # Parameters
 from parameters import parameters
 
+import html
+import io
+import json
 import os
-from PIL import Image
-import pyheif
-
-
-def other_formats_to_jpg(path):
-    for file in os.listdir(path):
-        if file.endswith('.png') or file.endswith('.jpeg'):
-            img = Image.open(os.path.join(path, file))
-            if img.mode == 'RGBA':
-                img = img.convert('RGB')
-            img.save(os.path.join(path, file.replace('png', 'jpg').replace('jpeg', 'jpg')))
-        elif file.endswith('.heic'):
-            heif_file = pyheif.read(os.path.join(path, file))
-            img = Image.frombytes(
-                heif_file.mode, 
-                heif_file.size, 
-                heif_file.data,
-                "raw",
-                heif_file.mode,
-                heif_file.stride,
-            )
-            img = img.convert('RGB')
-            img.save(os.path.join(path, file.replace('heic', 'jpg')))
-            os.remove(os.path.join(path, file))
-
-def make_image_640_640(path):
-    for file in os.listdir(path):
-        if file.endswith('.jpg'):
-            img = Image.open(os.path.join(path, file))
-            img = img.resize((640, 640))
-            img.save(os.path.join(path, file))
-        os.rename(os.path.join(path, file), os.path.join(path, file.lower()))
-
-def generate_html_from_photos(path):
-    html_content = ""
-    for file in os.listdir(path):
-        if file.endswith('.jpg'):
-            name, surname = file.replace('.jpg', '').split('_')
-            full_name = f"{name.capitalize()} {surname.capitalize()}"
-            tag = "h3"
-            # If the full name is too long, use a smaller tag
-            if len(full_name) >= 19:
-                tag = "h4"
-            # Lowercase the names in the filename
-            filename = file.lower()
-            html_content += f"""
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from string import Template
+from PIL import Image, ImageOps
+
+from about_us import section_titles
+from members import MemberSet
+from names import name_key
+from photo_manifest import PhotoManifest, file_sha256
+
+
+SOURCE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.heic')
+
+# Sides of the square photos generated, the biggest one is the main photo name_surname.jpg
+PHOTO_SIZES = (100, 200, 640)
+# Maximum bytes of the encoded photos of each size, the quality is lowered until they fit
+PHOTO_BUDGETS = {100: 8_000, 200: 20_000, 640: 90_000}
+QUALITIES = (85, 78, 70, 62, 55, 45)
+FORMATS = ('jpg', 'webp')
+
+
+def load_image(path):
+    """Decode a photo (HEIC, PNG or JPEG) as an RGB image, rotated as the camera saw it."""
+    if path.lower().endswith('.heic'):
+        import pyheif
+
+        heif_file = pyheif.read(path)
+        img = Image.frombytes(
+            heif_file.mode,
+            heif_file.size,
+            heif_file.data,
+            "raw",
+            heif_file.mode,
+            heif_file.stride,
+        )
+    else:
+        img = ImageOps.exif_transpose(Image.open(path))
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+    return img
+
+@lru_cache(maxsize=1)
+def face_cascade():
+    """Return the OpenCV face detector, or None if OpenCV (optional) isn't installed."""
+    try:
+        import cv2
+    except ImportError:
+        return None
+    return cv2.CascadeClassifier(os.path.join(cv2.data.haarcascades, 'haarcascade_frontalface_default.xml'))
+
+def face_box(img, detection_size=400):
+    """Return the (left, top, right, bottom) box of the biggest face in the photo, or None.
+
+    The faces are searched on a small copy of the photo, None without OpenCV.
+    """
+    cascade = face_cascade()
+    if cascade is None:
+        return None
+    import numpy as np
+
+    scale = min(1.0, detection_size / max(img.size))
+    small = img.convert('L')
+    if scale < 1.0:
+        small = small.resize((round(img.width * scale), round(img.height * scale)))
+    faces = cascade.detectMultiScale(np.asarray(small), scaleFactor=1.1, minNeighbors=5,
+                                     minSize=(small.width // 10, small.height // 10))
+    if len(faces) == 0:
+        return None
+    x, y, w, h = max(faces, key=lambda face: face[2] * face[3])
+    return (x / scale, y / scale, (x + w) / scale, (y + h) / scale)
+
+def square_crop(img, box=None):
+    """Crop the biggest square of the photo centered on the box (e.g. a face), or on the photo's center."""
+    side = min(img.size)
+    if box is None:
+        center_x, center_y = img.width / 2, img.height / 2
+    else:
+        center_x, center_y = (box[0] + box[2]) / 2, (box[1] + box[3]) / 2
+    left = round(min(max(center_x - side / 2, 0), img.width - side))
+    top = round(min(max(center_y - side / 2, 0), img.height - side))
+    return img.crop((left, top, left + side, top + side))
+
+def encode_within_budget(img, extension, budget):
+    """Encode the image as progressive, optimized JPEG or WebP, lowering the quality until it fits in budget bytes."""
+    for quality in QUALITIES:
+        buffer = io.BytesIO()
+        if extension == 'webp':
+            img.save(buffer, format='WEBP', quality=quality, method=6)
+        else:
+            img.save(buffer, format='JPEG', quality=quality, optimize=True, progressive=True)
+        if buffer.tell() <= budget:
+            break
+    # The lowest quality is kept even if it's still too big
+    return buffer.getvalue()
+
+def variant_name(filename, size, extension, sizes=PHOTO_SIZES):
+    """Path, relative to the photos folder, of a size and format of the photo filename (name_surname.jpg)."""
+    if size == max(sizes) and extension == 'jpg':
+        return filename
+    stem = os.path.splitext(filename)[0]
+    return f"{size}/{stem}.{extension}"
+
+def variant_paths(output, sizes=PHOTO_SIZES):
+    """Paths of every size and format of an output photo, the main one first."""
+    path, filename = os.path.split(output)
+    return [os.path.join(path, variant_name(filename, size, extension, sizes))
+            for size in sorted(sizes, reverse=True) for extension in FORMATS]
+
+def write_atomically(path, data):
+    # Write next to the output and rename, so an interrupted run never leaves half a photo
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path + '.tmp', 'wb') as f:
+        f.write(data)
+    os.replace(path + '.tmp', path)
+
+def process_photo(source, output, sizes=PHOTO_SIZES, budgets=PHOTO_BUDGETS):
+    """Decode a photo once, crop it to a square around the face and encode all its sizes. Runs in the worker processes."""
+    img = load_image(source)
+    source_size = img.size
+    img = square_crop(img, face_box(img))
+    path, filename = os.path.split(output)
+    for size in sorted(sizes, reverse=True):
+        resized = img if img.size == (size, size) else img.resize((size, size), Image.LANCZOS)
+        for extension in FORMATS:
+            data = encode_within_budget(resized, extension, budgets.get(size, PHOTO_BUDGETS[max(PHOTO_BUDGETS)]))
+            write_atomically(os.path.join(path, variant_name(filename, size, extension, sizes)), data)
+    return output, source_size
+
+def rename_outputs(path, old, new, sizes=PHOTO_SIZES):
+    """Move the outputs of a photo to a new name, e.g. after fixing a typo in NAME_SURNAME."""
+    for old_path, new_path in zip(variant_paths(os.path.join(path, old), sizes), variant_paths(os.path.join(path, new), sizes)):
+        if os.path.exists(old_path) and old_path != new_path:
+            os.replace(old_path, new_path)
+
+def remove_outputs(path, filename, sizes):
+    for output in variant_paths(os.path.join(path, filename), sizes):
+        if os.path.exists(output):
+            os.remove(output)
+
+def relative_outputs(filename, sizes):
+    return [variant_name(filename, size, extension, sizes) for size in sorted(sizes, reverse=True) for extension in FORMATS]
+
+def update_photos(path, manifest, sizes=PHOTO_SIZES, budgets=PHOTO_BUDGETS, processes=None):
+    """Bring the photos folder up to date with the manifest. Return the outputs written.
+
+    Only new or changed photos are decoded and encoded, in a process pool: unchanged
+    outputs are recognized by the manifest, and a photo renamed (or added again) with
+    the same content has its outputs moved instead of made again. NAME_SURNAME.EXT
+    becomes name_surname.jpg, and if more sources have the same output the most
+    recent one is used (the older ones are removed with it). A photo that can't be
+    processed is reported and skipped, and the sources are removed only once the
+    manifest with their outputs is saved.
+    """
+    jobs = {}
+    # Sources replaced by their output, e.g. NAME_SURNAME.png by name_surname.jpg
+    replaced = []
+    # Older sources of the same output as a job, removed if the job succeeds
+    superseded = {}
+    for file in sorted(os.listdir(path)):
+        stem, extension = os.path.splitext(file)
+        if extension.lower() not in SOURCE_EXTENSIONS:
+            continue
+        source = os.path.join(path, file)
+        if manifest.is_output(file):
+            if manifest.photos[file]["sizes"] != list(sizes):
+                # Sizes changed: the main photo is the best source left
+                jobs[file] = (source, manifest.photos[file]["source_sha256"])
+            continue
+
+        output_name = stem.lower() + '.jpg'
+        source_sha256 = file_sha256(source)
+        known = manifest.find(source_sha256)
+        if known is not None and (known == output_name or output_name not in manifest.photos):
+            if known != output_name:
+                known_sizes = manifest.photos[known]["sizes"]
+                rename_outputs(path, known, output_name, known_sizes)
+                manifest.rename(known, output_name, relative_outputs(output_name, known_sizes))
+            replaced.append((source, os.path.join(path, output_name)))
+            continue
+        if output_name not in jobs:
+            jobs[output_name] = (source, source_sha256)
+        elif os.path.getmtime(source) > os.path.getmtime(jobs[output_name][0]):
+            superseded.setdefault(output_name, []).append(jobs[output_name][0])
+            jobs[output_name] = (source, source_sha256)
+        else:
+            superseded.setdefault(output_name, []).append(source)
+
+    # Photos deleted from the folder lose their other sizes too
+    for filename in list(manifest.photos):
+        if filename not in jobs and not os.path.exists(os.path.join(path, filename)):
+            remove_outputs(path, filename, manifest.remove(filename)["sizes"])
+
+    written = []
+    if jobs:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            futures = {
+                name: executor.submit(process_photo, jobs[name][0], os.path.join(path, name), sizes, budgets)
+                for name in sorted(jobs)
+            }
+            for name, future in futures.items():
+                source, source_sha256 = jobs[name]
+                try:
+                    output, source_size = future.result()
+                except Exception as e:
+                    print(f"Could not process {os.path.basename(source)}, skipped: {e}")
+                    continue
+                manifest.add(name, os.path.basename(source), source_sha256, sizes, source_size, relative_outputs(name, sizes))
+                replaced.append((source, output))
+                replaced.extend((older, output) for older in superseded.get(name, []))
+                written.append(output)
+
+    manifest.save()
+    for source, output in replaced:
+        if os.path.exists(source) and not os.path.samefile(source, output):
+            os.remove(source)
+    return written
+
+def srcset(filename, extension, sizes=PHOTO_SIZES):
+    return ", ".join(
+        f'{parameters["url_to_members_files"]}/{variant_name(filename, size, extension, sizes)} {size}w'
+        for size in sorted(sizes)
+    )
+
+MEMBER_TEMPLATE = Template("""
     <div style="display: inline-block; overflow: hidden; margin-bottom: 25px; width: 160px; text-align: center; color: #00aaf5;">
-        <img
-            style="border-radius: 50%;max-width: 100px; border: 2px solid rgba(0, 0, 0, 0.1);"
-            src="{parameters["url_to_members_files"]}/{filename}"
-        />
+        <picture>
+            <source type="image/webp" sizes="100px" srcset="$webp_srcset" />
+            <img
+                style="border-radius: 50%;max-width: 100px; border: 2px solid rgba(0, 0, 0, 0.1);"
+                src="$src"
+                sizes="100px"
+                srcset="$jpg_srcset"
+                loading="lazy"
+            />
+        </picture>
         <div style="margin-top: 2px; position: relative">
-            <{tag} style="margin: 0; font-weight: 400; padding-bottom: 4px">
-                {full_name}
-                <span style="display: block; font-size: 11px; color: #aaaaaa; line-height: 1.6;">{parameters["default_role"]}</span>
-            </{tag}>
+            <$tag style="margin: 0; font-weight: 400; padding-bottom: 4px">
+                $name
+                <span style="display: block; font-size: 11px; color: #aaaaaa; line-height: 1.6;">$role</span>
+            </$tag>
         </div>
     </div>
-            """
-    with open('./photos/index.html', 'w') as f:
-        f.write(html_content)
+            """)
+SECTION_TEMPLATE = Template("""
+<h2>$title</h2>
+""")
 
-if __name__ == '__main__':
+# Sections of the About Us page, in the order of the site
+SECTIONS = ("board", "esners", "alumni")
+
+def html_fingerprint(sizes=PHOTO_SIZES):
+    """What all the HTML fragments depend on besides the member, the cached ones are made again when it changes."""
+    return json.dumps([parameters["url_to_members_files"], list(sizes), MEMBER_TEMPLATE.template])
+
+def member_fragment(member, role, sizes=PHOTO_SIZES):
+    """Return the HTML of a member's photo, name and role."""
+    full_name = " ".join(word.capitalize() for word in member.name.split())
+    # The avatars are 100px wide: the browser picks the smallest size good for the screen, WebP if supported
+    return MEMBER_TEMPLATE.substitute(
+        webp_srcset=srcset(member.photo, 'webp', sizes),
+        jpg_srcset=srcset(member.photo, 'jpg', sizes),
+        src=f'{parameters["url_to_members_files"]}/{member.photo}',
+        # If the full name is too long, use a smaller tag
+        tag="h4" if len(full_name) >= 19 else "h3",
+        name=html.escape(full_name, quote=False),
+        role=html.escape(role, quote=False),
+    )
+
+def load_roster():
+    """Return the members of the latest Jupiter export, or None if there is none."""
+    from members_xlsx import load_members_xlsx
+
+    try:
+        return MemberSet.from_dataframe(load_members_xlsx())
+    except (OSError, IndexError) as e:
+        print(f"No Jupiter export found ({e}), every member gets the default role.")
+        return None
+
+def member_section(member, roster=None, board_roles=None):
+    """Return the (section, role) of a member: the board from board_roles, the others by their category on Jupiter.
+
+    Names are compared by name_key, so accents, case and word order don't matter.
+    """
+    board_roles = board_roles or {}
+    for name, role in board_roles.items():
+        if name_key(name) == member.key:
+            return "board", role
+    roles = {"esners": parameters["default_role"], "alumni": "Alumno", **parameters.get("roles", {})}
+    known = roster.get(member.name) if roster is not None else None
+    category = known.category if known is not None and known.category in roles else "esners"
+    return category, roles[category]
+
+def generate_html_from_photos(path, sizes=PHOTO_SIZES, manifest=None, roster=None, board_roles=None):
+    """Write photos/index.html with the About Us sections, streaming the fragments cached in the manifest to the file."""
+    board_roles = board_roles or {}
+    sections = {section: [] for section in SECTIONS}
+    for member in MemberSet.from_photos(path):
+        section, role = member_section(member, roster, board_roles)
+        sections[section].append((member, role))
+    # The board in the order of board_roles (e.g. the president first), the others by name
+    board_order = [name_key(name) for name in board_roles]
+    sections["board"].sort(key=lambda item: board_order.index(item[0].key))
+    titles = {section: title for title, section in section_titles(parameters["year"]).items()}
+
+    with open(os.path.join(path, 'index.html'), 'w') as f:
+        for section, members in sections.items():
+            if not members:
+                continue
+            f.write(SECTION_TEMPLATE.substitute(title=titles[section]))
+            for member, role in members:
+                fragment = manifest.fragment(member.photo, role) if manifest else None
+                if fragment is None:
+                    fragment = member_fragment(member, role, sizes)
+                    if manifest:
+                        manifest.set_fragment(member.photo, fragment, role)
+                f.write(fragment)
+
+def main():
     """Generates a HTML file with the photos of the members"""
     path = './photos'
-    other_formats_to_jpg(path)
-    print('All images in the directory have been converted to jpg format.')
-    make_image_640_640(path)
-    print('All images in the directory have been resized to 640x640 pixels.')
-    generate_html_from_photos(path)
-    print('HTML file has been generated from the photos.')
\ No newline at end of file
+    sizes = tuple(parameters.get("photo_sizes", PHOTO_SIZES))
+    budgets = {**PHOTO_BUDGETS, **parameters.get("photo_budgets", {})}
+    manifest = PhotoManifest(path, html_fingerprint(sizes))
+    processed = update_photos(path, manifest, sizes, budgets, processes=parameters.get("photo_processes"))
+    print(f'{len(processed)} new or changed images have been cropped and saved in sizes {", ".join(map(str, sizes))}.')
+    generate_html_from_photos(path, sizes, manifest, load_roster(), parameters.get("board_roles"))
+    manifest.save()
+    print('HTML file has been generated from the photos.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+import hashlib
+import os
+import pickle
+from datetime import datetime, timedelta
+
+import pandas as pd
+from termcolor import colored
+
+from names import replace_multiple_spaces_with_single_space
+
+MEMBERS_DIR = './members/'
+FILE_PREFIX = 'ESN ENEA Modena_complete'
+CACHE_DIR = './data/cache/'
+# Bump when parse_members_xlsx or the name normalization change, so the cached members are parsed again
+CACHE_VERSION = 1
+
+# Sheets of the Jupiter export and the category of their members
+SHEETS = {
+    "ESNER": "esners",
+    "ALUMNO": "alumni",
+}
+COLUMNS = ['First Name', 'Last Name', 'Birthdate']
+
+
+def latest_members_file(members_dir=MEMBERS_DIR, prefix=FILE_PREFIX):
+    """Return the path of the most recent Jupiter export in the members directory."""
+    files = [f for f in os.listdir(members_dir) if f.startswith(prefix) and f.endswith('.xlsx')]
+    files.sort(key=lambda x: os.path.getmtime(os.path.join(members_dir, x)), reverse=True)
+    return os.path.join(members_dir, files[0])
+
+
+def print_file_age(path):
+    """Print the file's age in green if less than 15 days old, otherwise in red."""
+    file_mod_time = datetime.fromtimestamp(os.path.getmtime(path))
+    file_age = datetime.now() - file_mod_time
+    if file_age < timedelta(days=15):
+        print(colored(f"The file is {file_age.days} days old.", "green"))
+    else:
+        print(colored(f"The file is {file_age.days} days old.", "red"))
+
+
+def file_hash(path):
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def parse_members_xlsx(path):
+    """Read the members of a Jupiter export as a DataFrame with the columns name, birthdate and category."""
+    # Only the needed columns of the needed sheets, in a single pass over the workbook
+    sheets = pd.read_excel(path, sheet_name=list(SHEETS), usecols=COLUMNS, dtype={'First Name': str, 'Last Name': str})
+    frames = []
+    for sheet_name, category in SHEETS.items():
+        df = sheets[sheet_name]
+        full_names = (df['First Name'].fillna('') + ' ' + df['Last Name'].fillna('')).str.strip()
+        frames.append(pd.DataFrame({
+            "name": full_names.map(replace_multiple_spaces_with_single_space),
+            # Jupiter gives either dates or dd/mm/yyyy strings
+            "birthdate": pd.to_datetime(df['Birthdate'], format='%d/%m/%Y', errors='coerce'),
+            "category": category,
+        }))
+    members = pd.concat(frames, ignore_index=True)
+    return members[members["name"] != ""].reset_index(drop=True)
+
+
+def load_members_xlsx(path=None, cache_dir=CACHE_DIR):
+    """Load the members of the most recent Jupiter export (or of path), caching the parsed result.
+
+    The cache is reused while the file has the same modification time and size,
+    or the same content hash if it was only touched, and CACHE_VERSION didn't change.
+    """
+    if path is None:
+        path = latest_members_file()
+    print_file_age(path)
+
+    stat = os.stat(path)
+    # Exports of different sections may have the same file name in different directories
+    path_hash = hashlib.sha1(os.path.abspath(path).encode()).hexdigest()[:8]
+    cache_path = os.path.join(cache_dir, f'{os.path.basename(path)}.{path_hash}.pkl')
+    cached = None
+    if os.path.exists(cache_path):
+        try:
+            with open(cache_path, 'rb') as f:
+                cached = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            cached = None
+    if cached is not None and cached.get("version") != CACHE_VERSION:
+        cached = None
+
+    if cached is not None and cached["mtime"] == stat.st_mtime and cached["size"] == stat.st_size:
+        return cached["members"]
+
+    sha256 = file_hash(path)
+    if cached is not None and cached["sha256"] == sha256:
+        members = cached["members"]
+    else:
+        members = parse_members_xlsx(path)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    # Written aside and renamed, so a concurrent or interrupted run never reads a half-written cache
+    tmp_path = cache_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump({
+            "version": CACHE_VERSION,
+            "mtime": stat.st_mtime,
+            "size": stat.st_size,
+            "sha256": sha256,
+            "members": members,
+        }, f)
+    os.replace(tmp_path, cache_path)
+    return members
@@ -0,0 +1,68 @@
+from names import name_key
+
+
+class NameIndex:
+    """Inverted index from name token to names, answering "is there an equal name?" without comparing every pair.
+
+    Two names are equal with the rules of checks_for_differences.equal_names: if both
+    have exactly 2 words they must be identical, otherwise they must share at least
+    2 words (counted on the name being looked up). Words are taken from the name_key
+    of the names, so accents, case and word order don't matter.
+
+    It indexes names, or members.Member objects if key is member_key.
+    """
+
+    def __init__(self, names, key=name_key):
+        self.names = list(names)
+        self.key = key
+        self.tokens = []
+        self.postings = {}
+        self.two_word_names = set()
+        for i, name in enumerate(self.names):
+            tokens = key(name).split()
+            self.tokens.append(tokens)
+            if len(tokens) == 2:
+                self.two_word_names.add(tuple(tokens))
+            for token in set(tokens):
+                self.postings.setdefault(token, []).append(i)
+
+    def contains(self, name):
+        """True if an equal name is in the index."""
+        tokens = self.key(name).split()
+        if len(tokens) == 2 and tuple(tokens) in self.two_word_names:
+            return True
+
+        # Count the shared words of the candidates, they need at least 2
+        shared = {}
+        for token in tokens:
+            for i in self.postings.get(token, ()):
+                count = shared.get(i, 0) + 1
+                shared[i] = count
+                if count == 2 and (len(tokens) != 2 or len(self.tokens[i]) != 2):
+                    return True
+        return False
+
+    def missing(self, names):
+        """Return the set of names without an equal name in the index."""
+        return {name for name in names if not self.contains(name)}
+
+
+def member_key(member):
+    """Key function to index members.Member objects, their key is already computed."""
+    return member.key
+
+
+def reconcile(members_a, members_b, categories=("esners", "alumni")):
+    """Compare two members.MemberSet in both directions.
+
+    Return (in a but not in b, in b but not in a), as dicts of category -> set of names.
+    Each side is indexed once per category and every member is looked up once.
+    """
+    missing_from_b = {}
+    missing_from_a = {}
+    for category in categories:
+        index_a = NameIndex(members_a.category(category), key=member_key)
+        index_b = NameIndex(members_b.category(category), key=member_key)
+        missing_from_b[category] = {member.name for member in index_b.missing(members_a.category(category))}
+        missing_from_a[category] = {member.name for member in index_a.missing(members_b.category(category))}
+    return missing_from_b, missing_from_a
@@ -0,0 +1,40 @@
+import re
+import unicodedata
+from functools import lru_cache
+
+# Letters NFKD doesn't decompose into a base letter and an accent
+TRANSLITERATIONS = str.maketrans({
+    "ß": "ss", "æ": "ae", "œ": "oe", "ø": "o", "ł": "l", "đ": "d", "ð": "d", "þ": "th", "ı": "i",
+})
+
+APOSTROPHES = re.compile(r"['’‘`´ʼ]")
+SEPARATORS = re.compile(r"[-‐‑–—_.,]")
+NOT_ALPHANUMERIC = re.compile(r"[^a-z0-9 ]")
+
+
+@lru_cache(maxsize=65536)
+def replace_multiple_spaces_with_single_space(string):
+    """Replace multiple spaces with a single space and capitalize the first letter of each word.
+
+    The members cached by members_xlsx are normalized with it: bump its CACHE_VERSION when this changes.
+    """
+    string = string.strip().encode('utf-8').decode('utf-8')
+    return ' '.join([word.capitalize() for word in string.split()])
+
+
+@lru_cache(maxsize=65536)
+def name_key(name):
+    """Canonical key of a name, equal for the different spellings of the same person.
+
+    Accents are dropped (José -> jose), letters are transliterated (ß -> ss),
+    apostrophes are removed (D'Angelo -> dangelo), hyphens split words
+    (Anna-Maria -> anna maria) and the words are sorted, so the order of
+    first and last names doesn't matter either.
+    """
+    name = unicodedata.normalize("NFKD", name.lower())
+    name = "".join(char for char in name if not unicodedata.combining(char))
+    name = name.translate(TRANSLITERATIONS)
+    name = APOSTROPHES.sub("", name)
+    name = SEPARATORS.sub(" ", name)
+    name = NOT_ALPHANUMERIC.sub("", name)
+    return " ".join(sorted(name.split()))
@@ -0,0 +1,103 @@
+import time
+from urllib.parse import urljoin, urlparse
+
+from crawl_rules import CrawlRules
+from html_scan import PARSERS
+
+
+class PageAnalyzer:
+    """Parse a page and run the crawler checks on it.
+
+    It holds no locks, files or connections, so it can be sent to worker processes
+    and only the compact page dict (links and findings) travels back.
+    """
+
+    def __init__(self, base_domain, parser="bs4", rules=None):
+        self.base_domain = base_domain
+        self.parser = parser
+        self.parse_html = PARSERS[parser]
+        self.rules = rules or CrawlRules()
+
+    def fingerprint(self):
+        """What the page dicts are made from: the base domain, the parser and the rules."""
+        return f"{self.base_domain}|{self.parser}|{self.rules.fingerprint()}"
+
+    def should_ignore_url(self, url):
+        """Check if URL should be ignored based on filtering rules. Return the name of the rule that fired."""
+        return self.rules.ignore.search(url)
+
+    def check_name_change(self, text, url):
+        """Check if there's a name change in the text. Return the new name found."""
+        if self.rules.old_names.search(text) is not None:
+            new_name = self.rules.new_names.search(text)
+            if new_name is not None:
+                return new_name
+        return False
+
+    def check_correct_url(self, old_url_hrefs):
+        """Check if the links to the old URLs found by the parser have to be reported."""
+        findings = []
+        
+        # Check in href attributes
+        for href, rule in old_url_hrefs:
+            if not self.should_ignore_url(href):
+                findings.append(f"Found in link: {href} ({rule})")
+        
+        if findings:
+            return findings
+        
+        return False
+
+    def extract_links(self, current_url, hrefs):
+        """Extract links from the page that belong to the same domain."""
+        links = set()
+        for href in hrefs:
+            full_url = urljoin(current_url, href)
+            
+            # Parse URL to check domain and filter out fragments
+            parsed_url = urlparse(full_url)
+            
+            # Only process URLs from the same domain and ignore fragments
+            if parsed_url.netloc == self.base_domain and not parsed_url.fragment:
+                # Remove fragments and normalize URL
+                clean_url = f"{parsed_url.scheme}://{parsed_url.netloc}{parsed_url.path}"
+                if parsed_url.query:
+                    clean_url += f"?{parsed_url.query}"
+                
+                links.add(clean_url)
+
+        
+        return links
+
+    def analyze(self, url, content):
+        """Parse a fetched page and run the checks.
+        
+        Return a page dict with the links it contains and the findings, ready to be cached."""
+        return self.analyze_timed(url, content)[0]
+
+    def analyze_timed(self, url, content):
+        """Same as analyze, also returning the parse and check times in seconds."""
+        start = time.perf_counter()
+        text, hrefs, old_url_hrefs = self.parse_html(content, self.rules.old_domains)
+        parsed = time.perf_counter()
+        
+        page = {
+            "links": sorted(self.extract_links(url, hrefs)),
+            "name_change": self.check_name_change(text, url),
+            "old_urls": self.check_correct_url(old_url_hrefs) or []
+        }
+        return page, parsed - start, time.perf_counter() - parsed
+
+
+# Analyzer of the current worker process, set by init_worker
+worker_analyzer = None
+
+
+def init_worker(analyzer):
+    """Initializer of the process pool: keep the analyzer so it's sent once per process."""
+    global worker_analyzer
+    worker_analyzer = analyzer
+
+
+def analyze_in_worker(url, content):
+    return worker_analyzer.analyze_timed(url, content)
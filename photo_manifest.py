@@ -0,0 +1,103 @@
+import hashlib
+import json
+import os
+
+MANIFEST_NAME = 'manifest.json'
+
+
+def file_sha256(path):
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def file_stat(path):
+    stat = os.stat(path)
+    return [stat.st_mtime, stat.st_size]
+
+
+class PhotoManifest:
+    """Manifest of the processed photos, saved as manifest.json in the photos folder.
+
+    Every main photo (name_surname.jpg) has the hash of its source and of itself,
+    its outputs, the size of the source and its cached HTML fragment. The fragments
+    are dropped when fingerprint (what they are all generated from) changes.
+    """
+
+    def __init__(self, path, fingerprint=None):
+        self.file = os.path.join(path, MANIFEST_NAME)
+        self.path = path
+        self.fingerprint = fingerprint
+        try:
+            with open(self.file, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        self.photos = data.get("photos", {})
+        if data.get("fingerprint") != fingerprint:
+            for entry in self.photos.values():
+                entry["fragment"] = None
+
+    def is_output(self, filename):
+        """True if the file is the unchanged main photo of an entry (the hash is only read if its mtime or size changed)."""
+        entry = self.photos.get(filename)
+        if entry is None:
+            return False
+        path = os.path.join(self.path, filename)
+        stat = file_stat(path)
+        if stat == entry["stat"]:
+            return True
+        if file_sha256(path) == entry["sha256"]:
+            entry["stat"] = stat
+            return True
+        return False
+
+    def find(self, sha256):
+        """Return the main photo made from, or equal to, the file with this hash, or None."""
+        for filename, entry in self.photos.items():
+            if sha256 in (entry["source_sha256"], entry["sha256"]):
+                return filename
+        return None
+
+    def add(self, filename, source, source_sha256, sizes, source_size, outputs):
+        path = os.path.join(self.path, filename)
+        self.photos[filename] = {
+            "source": source,
+            "source_sha256": source_sha256,
+            "source_size": list(source_size),
+            "sha256": file_sha256(path),
+            "stat": file_stat(path),
+            "sizes": list(sizes),
+            "outputs": outputs,
+            "fragment": None,
+        }
+
+    def rename(self, old, new, outputs):
+        entry = self.photos.pop(old)
+        entry["outputs"] = outputs
+        entry["stat"] = file_stat(os.path.join(self.path, new))
+        entry["fragment"] = None
+        self.photos[new] = entry
+
+    def remove(self, filename):
+        return self.photos.pop(filename, None)
+
+    def fragment(self, filename, key=None):
+        """Return the cached fragment of a photo if it was made for the same key (e.g. the member's role)."""
+        entry = self.photos.get(filename)
+        if entry is None or entry.get("fragment_key") != key:
+            return None
+        return entry["fragment"]
+
+    def set_fragment(self, filename, fragment, key=None):
+        if filename in self.photos:
+            self.photos[filename]["fragment"] = fragment
+            self.photos[filename]["fragment_key"] = key
+
+    def save(self):
+        tmp_file = self.file + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump({"fingerprint": self.fingerprint, "photos": self.photos}, f, indent=4, ensure_ascii=False)
+        os.replace(tmp_file, self.file)
@@ -0,0 +1,87 @@
+import asyncio
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+# Statuses meaning the server wants us to slow down
+THROTTLE_STATUSES = {429, 503}
+
+# Client errors that may succeed if retried, every other 4XX is permanent
+RETRYABLE_CLIENT_ERRORS = {408, 425, 429}
+
+
+def is_permanent_error(status_code):
+    """True if retrying a request that got this status is pointless (e.g. 404)."""
+    return status_code is not None and 400 <= status_code < 500 and status_code not in RETRYABLE_CLIENT_ERRORS
+
+
+def parse_retry_after(value):
+    """Return the seconds to wait from a Retry-After header (delay in seconds or HTTP date), or None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return max(0.0, (date - datetime.now(timezone.utc)).total_seconds())
+
+
+class AdaptiveRateLimiter:
+    """Token bucket shared by all the workers, whose rate follows the server (additive increase, multiplicative decrease).
+
+    The rate grows while the responses are faster than `target_latency`, and it's
+    halved on 429, 5XX, timeouts and connection errors. A Retry-After pauses every worker.
+    """
+
+    def __init__(self, rate, min_rate=0.5, max_rate=None, target_latency=1.0, increase=0.5):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate or rate * 4
+        self.target_latency = target_latency
+        self.increase = increase
+        self.next_slot = 0.0
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        """Take the next token, returning the seconds to wait before using it."""
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot, self.paused_until)
+            self.next_slot = slot + 1 / self.rate
+            return slot - now
+
+    def wait(self):
+        """Block until a request can be sent. Return the seconds waited."""
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    async def wait_async(self):
+        """Same as wait, without blocking the event loop."""
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return delay
+
+    def on_success(self, latency):
+        with self.lock:
+            if latency < self.target_latency:
+                self.rate = min(self.max_rate, self.rate + self.increase)
+            else:
+                self.rate = max(self.min_rate, self.rate * 0.9)
+
+    def on_throttle(self, retry_after=None):
+        """Slow down after a 429/5XX/timeout/connection error, pausing for `retry_after` seconds if the server asked so."""
+        with self.lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            if retry_after:
+                self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
@@ -0,0 +1,82 @@
+import ast
+import json
+import os
+from datetime import datetime
+
+HISTORY_PATH = './data/history.jsonl'
+LEGACY_LOG_PATH = './data/log_missing.txt'
+
+
+def read_last_line(path, block_size=4096):
+    """Return the last non-empty line of a file, reading backwards from the end. None if there is none."""
+    with open(path, 'rb') as f:
+        position = f.seek(0, os.SEEK_END)
+        data = b''
+        while position > 0:
+            size = min(block_size, position)
+            position -= size
+            f.seek(position)
+            data = f.read(size) + data
+            stripped = data.rstrip(b'\n')
+            if b'\n' in stripped:
+                return stripped.rsplit(b'\n', 1)[1]
+        return data.rstrip(b'\n') or None
+
+
+class RunHistory:
+    """Append-only JSON Lines history of the reconciliation runs.
+
+    Every entry holds the missing members with the number of consecutive runs
+    they have been missing for, and the members resolved since the previous run,
+    so the queries only need the last entry, which is read from the end of the file.
+    """
+
+    def __init__(self, path=HISTORY_PATH, legacy_path=LEGACY_LOG_PATH):
+        self.path = path
+        if not os.path.exists(path) and legacy_path and os.path.exists(legacy_path):
+            self.migrate(legacy_path)
+
+    def last(self):
+        """Return the last entry, or None if nothing was recorded yet."""
+        if not os.path.exists(self.path):
+            return None
+        line = read_last_line(self.path)
+        return json.loads(line) if line else None
+
+    def record(self, missing, time=None, last=None):
+        """Append a run with the names currently missing and return its entry."""
+        last = self.last() if last is None else last
+        previous = last["missing"] if last else {}
+        entry = {
+            "run": last["run"] + 1 if last else 1,
+            "time": (time or datetime.now()).isoformat(timespec='seconds'),
+            "missing": {name: previous.get(name, 0) + 1 for name in sorted(missing)},
+            "resolved": sorted(name for name in previous if name not in missing),
+        }
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        return entry
+
+    def missing_for_more_than(self, runs):
+        """Return the members missing for more than `runs` consecutive runs, with their count."""
+        last = self.last()
+        if not last:
+            return {}
+        return {name: count for name, count in last["missing"].items() if count > runs}
+
+    def newly_resolved(self):
+        """Return the members that were missing in the previous run and aren't anymore."""
+        last = self.last()
+        return last["resolved"] if last else []
+
+    def migrate(self, legacy_path):
+        """Import the old log_missing.txt, whose lines are "<datetime>: <set of names>"."""
+        last = None
+        with open(legacy_path, encoding='utf-8') as f:
+            for line in f:
+                if ": " not in line:
+                    continue
+                time, missing = line.rstrip('\n').split(": ", 1)
+                missing = set() if missing == "set()" else set(ast.literal_eval(missing))
+                last = self.record(missing, time=datetime.fromisoformat(time), last=last or {})
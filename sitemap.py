@@ -0,0 +1,107 @@
+import gzip
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urljoin
+from urllib.robotparser import RobotFileParser
+
+import requests
+
+
+def fetch_robots(session, start_url, timeout=10):
+    """Download and parse the robots.txt of the site. Return the parser, allowing everything if it's missing."""
+    robots = RobotFileParser(urljoin(start_url, "/robots.txt"))
+    try:
+        response = session.get(robots.url, timeout=timeout)
+    except requests.exceptions.RequestException:
+        response = None
+    if response is None or response.status_code >= 400:
+        robots.parse([])
+    else:
+        robots.parse(response.text.splitlines())
+    return robots
+
+
+def local_name(tag):
+    """Strip the XML namespace from a tag."""
+    return tag.rsplit("}", 1)[-1]
+
+
+def iter_sitemap(session, url, timeout=10, seen=None):
+    """Yield (url, lastmod) for every page of a sitemap, following sitemap indexes.
+
+    The XML is parsed while it's downloaded and every entry is discarded once read,
+    so memory doesn't grow with the size of the sitemap.
+    """
+    seen = set() if seen is None else seen
+    if url in seen:
+        return
+    seen.add(url)
+
+    with session.get(url, timeout=timeout, stream=True) as response:
+        if response.status_code >= 400:
+            return
+        response.raw.decode_content = True
+        stream = response.raw
+        if url.endswith(".gz") and "gzip" not in response.headers.get("Content-Encoding", ""):
+            stream = gzip.GzipFile(fileobj=stream)
+
+        nested = []
+        loc, lastmod = None, None
+        for event, element in ET.iterparse(stream, events=("end",)):
+            name = local_name(element.tag)
+            if name == "loc":
+                loc = (element.text or "").strip()
+            elif name == "lastmod":
+                lastmod = (element.text or "").strip()
+            elif name == "url":
+                if loc:
+                    yield loc, parse_lastmod(lastmod)
+                loc, lastmod = None, None
+                element.clear()
+            elif name == "sitemap":
+                if loc:
+                    nested.append(loc)
+                loc, lastmod = None, None
+                element.clear()
+
+    for sitemap_url in nested:
+        yield from iter_sitemap(session, sitemap_url, timeout, seen)
+
+
+def parse_lastmod(value):
+    """Parse a W3C datetime of a sitemap as an aware datetime, or None."""
+    if not value:
+        return None
+    try:
+        date = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return date
+
+
+def parse_http_date(value):
+    """Parse a Last-Modified header as an aware datetime, or None."""
+    if not value:
+        return None
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return date
+
+
+def sitemap_urls(session, start_url, robots, timeout=10):
+    """Yield (url, lastmod) from the sitemaps listed in robots.txt, or from /sitemap.xml if there are none."""
+    sitemaps = robots.site_maps() or [urljoin(start_url, "/sitemap.xml")]
+    seen = set()
+    for sitemap_url in sitemaps:
+        try:
+            yield from iter_sitemap(session, sitemap_url, timeout, seen)
+        except (requests.exceptions.RequestException, ET.ParseError, OSError):
+            # A broken sitemap only means less seeds, the crawl still finds the pages by itself
+            continue